@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Synthetic BP document generator for load and scale testing
+Writes BP-like PDFs whose first page reproduces the 6-column
+"vue d'ensemble" layout read by 05_parse_bp_tables.py (4 tables, Table 3 with
+section headers, multi-line cells and French number formatting), plus
+optional filler pages, and a ground-truth CSV of the rows the parser must return.
+
+PDFs are written directly (Helvetica, WinAnsiEncoding), no extra dependency.
+
+Output: output/synthetic/BP_<year>_<collectivite>_extracted.pdf
+        output/synthetic/BP_<year>_<collectivite>_truth.csv
+
+Usage:
+    python src/00_generate_synthetic_bp.py --documents 500 --pages 40 --rows 12 --noise 0.5
+    python src/00_generate_synthetic_bp.py --documents 50 --check   # parse back and compare
+    python src/00_generate_synthetic_bp.py --check-expansion        # batch vs row-by-row expansion
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+parse_bp = importlib.import_module("05_parse_bp_tables")
+from pdf_memory import peak_rss_mb
+
+# Configuration
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+SYNTHETIC_DIR = OUTPUT_DIR / "synthetic"
+YEARS = [2021, 2022, 2023, 2024]
+
+PAGE_WIDTH = 841.88
+PAGE_HEIGHT = 595.28
+MARGIN = 41.8
+FONT_SIZE = 8.0
+LINE_HEIGHT = 9.6
+CELL_PADDING = 3.0
+TABLE_GAP = 14.0
+
+# Column widths of the 6-column tables (sum = PAGE_WIDTH - 2 * MARGIN)
+COLUMN_WIDTHS = [238.3, 104.0, 104.0, 104.0, 104.0, 104.2]
+
+HEADER_ROW = [
+    'SECTION', 'Pour mémoire, budget\nprécédent (1)', 'Restes à réaliser N-1',
+    'Propositions nouvelles', "Vote de l'assemblée", 'TOTAL\n(RAR N-1 + VOTE)',
+]
+
+# (parser section, section header, [(chapter label, [sub-line labels]), ...])
+SECTIONS = [
+    ('investment_expense', 'DEPENSES D’INVESTISSEMENT', [
+        ('90 Opérations ventilées', ['- en AP/CP (2)', '- hors AP/CP (2)', 'Dont opérations pour comptes de tiers']),
+        ('92 Opérations non ventilées', []),
+        ('001 Solde exécution invest. reporté', []),
+    ]),
+    ('investment_revenue', 'RECETTES D’INVESTISSEMENT', [
+        ('90 Opérations ventilées', ['- Recettes affectées', '- Financement par le tiers de l’opération']),
+        ('92 Opérations non ventilées (sauf 922-1068)', []),
+        ("954 Produit des cessions d'immobilisations", []),
+        ('951 Virement de la section de fonctionnement', []),
+        ('922-1068 Excédents de fonctionnement capitalisés', []),
+        ('001 Solde exécution invest. reporté', []),
+    ]),
+    ('operating_expense', 'DEPENSES DE FONCTIONNEMENT', [
+        ('93 Services ventilés', ['- en AE/CP', '- hors AE/CP']),
+        ('94 Services communs non ventilés', []),
+        ("953 Virement à la section d'investissement", []),
+        ('002 Résultat de fonctionnement reporté', []),
+    ]),
+    ('operating_revenue', 'RECETTES DE FONCTIONNEMENT', [
+        ('93 Services ventilés', []),
+        ('94 Services communs non ventilés', []),
+        ('002 Résultat de fonctionnement reporté', []),
+    ]),
+]
+
+# Extra chapter labels used when --rows asks for more rows than the template
+EXTRA_CHAPTERS = [
+    '900 Services généraux', '901 Sécurité', '902 Enseignement', '903 Culture, sports et loisirs',
+    '904 Santé et action sociale', '905 Aménagement des territoires', '906 Gestion des fonds européens',
+    '907 Environnement', '908 Transports', '909 Action économique',
+]
+
+# Cell lines for --check-expansion: section headers in several spellings, a
+# leading '=', Unicode whitespace and ligatures that change under upper()
+FUZZ_DESCRIPTIONS = [
+    "DEPENSES D'INVESTISSEMENT", 'recettes de fonctionnement', 'RECETTES D’INVESTISSEMENT',
+    '=  90 Opérations ventilées', '- en AP/CP', 'Total', ' x\x85', '', 'None', 'dépenses ﬁ',
+    'INVEﬆISSEMENT DEPENSES', '\x1f=a\xa0', 'ß recettes investißement', ' = =b ',
+]
+FUZZ_AMOUNTS = ['1 234,50', '', ' 7 ', '0,00\u3000', '\x1f1 ,2\xa0', '3 926 800 000,00']
+
+# Helvetica advance widths (1/1000 em) for right-aligning numbers
+DIGIT_WIDTHS = {**{d: 556 for d in '0123456789'}, ' ': 278, ',': 278, '-': 333}
+
+
+def format_french(amount_cents):
+    """Format an amount in cents the way BPs print it: '1 277 068 100,00'"""
+    units, cents = divmod(amount_cents, 100)
+    return f"{units:,}".replace(',', ' ') + f",{cents:02d}"
+
+
+def format_plain(amount_cents):
+    """Format an amount in cents the way the parser writes it: '1277068100.00'"""
+    units, cents = divmod(amount_cents, 100)
+    return f"{units}.{cents:02d}"
+
+
+def pdf_string(text):
+    """Encode text as a PDF literal string in WinAnsiEncoding"""
+    raw = text.encode('cp1252', errors='replace')
+    escaped = raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+    return b'(' + escaped + b')'
+
+
+def text_width(text, size):
+    """Approximate Helvetica width of a string"""
+    return sum(DIGIT_WIDTHS.get(ch, 556) for ch in text) * size / 1000
+
+
+class PageCanvas:
+    """Accumulates drawing operators for one page, top-left coordinates"""
+
+    def __init__(self, height):
+        self.height = height
+        self.ops = []
+
+    def rect(self, x, top, width, height):
+        y = self.height - top - height
+        self.ops.append(f"{x:.2f} {y:.2f} {width:.2f} {height:.2f} re S".encode())
+
+    def text(self, x, baseline, text, bold=False, size=FONT_SIZE):
+        y = self.height - baseline
+        font = b'/F2' if bold else b'/F1'
+        self.ops.append(b'BT ' + font + f" {size:.2f} Tf {x:.2f} {y:.2f} Td ".encode()
+                        + pdf_string(text) + b' Tj ET')
+
+    def stream(self):
+        return b'0.5 w\n' + b'\n'.join(self.ops)
+
+
+def draw_table(canvas, top, rows, widths, rng, noise, bold_rows=()):
+    """
+    Draw a bordered table; each cell holds one or more '\\n'-separated lines.
+    Text columns are left-aligned, numeric columns right-aligned.
+    Returns the bottom y (top-based) of the table.
+    """
+    x_positions = [MARGIN]
+    for width in widths[:-1]:
+        x_positions.append(x_positions[-1] + width)
+
+    y = top
+    for row_idx, row in enumerate(rows):
+        n_lines = max(len(cell.split('\n')) for cell in row)
+        # Layout noise: uneven row padding
+        padding = CELL_PADDING + rng.uniform(0, 2.5) * noise
+        height = n_lines * LINE_HEIGHT + 2 * padding
+        for col_idx, cell in enumerate(row):
+            x, width = x_positions[col_idx], widths[col_idx]
+            canvas.rect(x, y, width, height)
+            for line_idx, line in enumerate(cell.split('\n')):
+                if not line:
+                    continue
+                baseline = y + padding + (line_idx + 1) * LINE_HEIGHT - 2.0
+                if col_idx == 0:
+                    tx = x + CELL_PADDING
+                else:
+                    tx = x + width - CELL_PADDING - text_width(line, FONT_SIZE)
+                canvas.text(tx, baseline, line, bold=row_idx in bold_rows)
+        y += height
+    return y
+
+
+def build_main_table(rng, rows_per_section, noise):
+    """
+    Build Table 3 (raw cells) and the amounts behind it.
+    Returns list of (cells, kind, section, lines) where kind is 'header' or
+    'data' and lines holds one (label, amounts) per printed line, amounts in
+    cents (None for a blank cell).
+    """
+    table = []
+    for section, section_label, template in SECTIONS:
+        chapters = list(template)
+        extra = [(label, []) for label in EXTRA_CHAPTERS]
+        while len(chapters) < rows_per_section:
+            chapters.insert(1, extra[(len(chapters) - len(template)) % len(extra)])
+        chapters = chapters[:max(rows_per_section, 1)]
+
+        data_rows = []
+        section_totals = [0] * 5
+        for label, sublines in chapters:
+            # Layout noise: occasionally turn a single-line chapter into a multi-line one
+            if not sublines and rng.random() < 0.15 * noise:
+                sublines = ['- dont AP/CP', '- hors AP/CP']
+
+            anterieur = rng.randrange(0, 2_000_000) * 100 * rng.choice([0, 1])
+            proposed = rng.randrange(0, 1_500_000_000) * 100 if rng.random() > 0.2 else 0
+            vote = proposed + rng.choice([0, 0, 0, rng.randrange(-500, 500) * 100])
+            vote = max(vote, 0)
+            restes = rng.randrange(0, 50_000_000) * 100 if rng.random() < 0.2 else 0
+            top_values = [anterieur, restes, proposed, vote, restes + vote]
+
+            # Split each top-level amount over the sub-lines (last one takes the remainder)
+            lines = [top_values]
+            if sublines:
+                parts = [[0] * 5 for _ in sublines]
+                for col, value in enumerate(top_values):
+                    remaining = value
+                    for part in parts[:-1]:
+                        part[col] = rng.randrange(0, remaining + 1) if remaining else 0
+                        remaining -= part[col]
+                    parts[-1][col] = remaining
+                lines.extend(parts)
+
+            # Restes column is left blank (not '0,00') on some rows, as in real BPs
+            blank_restes = restes == 0 and rng.random() < 0.3
+            if blank_restes:
+                lines = [[None if col == 1 else v for col, v in enumerate(line)] for line in lines]
+            cells = ['\n'.join([label] + sublines)]
+            for col in range(5):
+                if col == 1 and blank_restes:
+                    cells.append('')
+                else:
+                    cells.append('\n'.join(format_french(line[col]) for line in lines))
+            data_rows.append((cells, 'data', section, list(zip([label] + sublines, lines))))
+            section_totals = [t + v for t, v in zip(section_totals, top_values)]
+
+        table.append(([section_label] + [format_french(v) for v in section_totals], 'header', section,
+                      [(section_label, section_totals)]))
+        table.extend(data_rows)
+    return table
+
+
+def truth_rows(main_table, region):
+    """
+    Expected parser output for Table 3, written from the generated amounts
+    (independent of the parser's own cleaning)
+    """
+    rows = []
+    for row_idx, (_, kind, section, lines) in enumerate(main_table):
+        for level, (label, amounts) in enumerate(lines):
+            rows.append(dict(zip(parse_bp.OUTPUT_COLUMNS, [
+                region, section, 'section_header' if kind == 'header' else 'data', min(level, 1), row_idx,
+                label, *('' if v is None else format_plain(v) for v in amounts),
+            ])))
+    return rows
+
+
+def build_document(region, year, n_pages, rows_per_section, noise, seed):
+    """Return (pdf_bytes, truth_rows) for one synthetic document"""
+    rng = random.Random(seed)
+    main_table = build_main_table(rng, rows_per_section, noise)
+
+    # Layout noise: jitter column widths, keeping the total width
+    widths = list(COLUMN_WIDTHS)
+    if noise:
+        for i in range(1, 6):
+            delta = rng.uniform(-8, 8) * noise
+            widths[i] += delta
+            widths[0] -= delta
+
+    # Page height grows with the main table so large --rows still fit on page 1
+    main_lines = sum(max(len(c.split('\n')) for c in cells) for cells, *_ in main_table)
+    first_height = max(PAGE_HEIGHT, 240 + main_lines * (LINE_HEIGHT + 2 * CELL_PADDING + 2.5 * noise))
+
+    pages = []
+    canvas = PageCanvas(first_height)
+    y = draw_table(canvas, MARGIN, [
+        ['II – PRESENTATION GENERALE DU BUDGET', 'II'],
+        ['BUDGET – RECAPITULATION PAR GROUPES FONCTIONNELS', 'C'],
+    ], [PAGE_WIDTH - 2 * MARGIN - 60, 60], rng, noise, bold_rows=(0, 1))
+    y = draw_table(canvas, y + TABLE_GAP, [HEADER_ROW], widths, rng, noise, bold_rows=(0,))
+    ap = rng.randrange(100_000_000, 2_000_000_000) * 100
+    ae = rng.randrange(100_000_000, 2_000_000_000) * 100
+    y = draw_table(canvas, y + TABLE_GAP, [
+        ['AP VOTEES', format_french(ap), '', format_french(ap), format_french(ap), format_french(ap)],
+        ['Dont dépenses imprévues (950)'] + [format_french(1_000_000_000)] * 5,
+        ['AE VOTEES', format_french(ae), '', format_french(ae), format_french(ae), format_french(ae)],
+        ['Dont dépenses imprévues (952)'] + [format_french(1_000_000_000)] * 5,
+    ], widths, rng, noise)
+    header_rows = tuple(i for i, (_, kind, *_) in enumerate(main_table) if kind == 'header')
+    draw_table(canvas, y + TABLE_GAP, [cells for cells, *_ in main_table], widths, rng, noise,
+               bold_rows=header_rows)
+    pages.append(canvas)
+
+    # Filler pages: detail tables of similar shape, ignored by the parser
+    for page_num in range(1, n_pages):
+        canvas = PageCanvas(PAGE_HEIGHT)
+        rows = [[f'Chapitre {900 + (page_num + i) % 10} - article {rng.randrange(10, 99)}']
+                + [format_french(rng.randrange(0, 10_000_000) * 100) for _ in range(5)]
+                for i in range(int(30 - 5 * noise))]
+        draw_table(canvas, MARGIN, [HEADER_ROW] + rows, widths, rng, noise, bold_rows=(0,))
+        pages.append(canvas)
+
+    return write_pdf(pages), truth_rows(main_table, region)
+
+
+def write_pdf(pages):
+    """Serialise page canvases into a minimal PDF 1.4 file"""
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        None,  # page tree, filled in below
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>',
+    ]
+    page_ids = []
+    for canvas in pages:
+        content = canvas.stream()
+        objects.append(b'<< /Length ' + str(len(content)).encode() + b' >>\nstream\n' + content + b'\nendstream')
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH:.2f} {canvas.height:.2f}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>".encode()
+        )
+        page_ids.append(len(objects))
+    kids = ' '.join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    out = io.BytesIO()
+    out.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = []
+    for obj_id, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{obj_id} 0 obj\n".encode() + body + b'\nendobj\n')
+    xref_offset = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def collectivite_names(n_documents):
+    """Synthetic collectivité names: ~100 départements then communes"""
+    names = []
+    for i in range(n_documents):
+        if i < 101:
+            names.append(f"SYN-Dep{i + 1:03d}")
+        else:
+            names.append(f"SYN-Com{i - 100:05d}")
+    return names
+
+
+def generate(n_documents, n_pages, rows_per_section, noise, seed, years):
+    """Generate documents over collectivités x years; returns list of (pdf_path, region)"""
+    SYNTHETIC_DIR.mkdir(parents=True, exist_ok=True)
+    generated = []
+    names = collectivite_names(max(1, -(-n_documents // len(years))))
+    for doc_idx in range(n_documents):
+        region = names[doc_idx // len(years)]
+        year = years[doc_idx % len(years)]
+        pdf_bytes, truth = build_document(region, year, n_pages, rows_per_section, noise, seed + doc_idx)
+
+        pdf_path = SYNTHETIC_DIR / f"BP_{year}_{region}_extracted.pdf"
+        pdf_path.write_bytes(pdf_bytes)
+        _write_truth(truth, SYNTHETIC_DIR / f"BP_{year}_{region}_truth.csv")
+        generated.append((pdf_path, region))
+    return generated
+
+
+def _write_truth(rows, output_path):
+    """Write ground truth with the parser's CSV writer, without its progress line"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        parse_bp.write_csv(rows, output_path)
+
+
+def check(generated):
+    """Parse generated documents back and compare with the ground truth"""
+    mismatches = 0
+    started = time.perf_counter()
+    for pdf_path, region in generated:
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = parse_bp.parse_pdf_to_rows(pdf_path, region, as_frame=True)
+        truth_path = pdf_path.with_name(pdf_path.name.replace('_extracted.pdf', '_truth.csv'))
+        parsed_path = pdf_path.with_name(pdf_path.name.replace('_extracted.pdf', '_parsed.csv'))
+        _write_truth(rows if rows is not None else [], parsed_path)
+        if parsed_path.read_bytes() != truth_path.read_bytes():
+            print(f"  MISMATCH: {pdf_path.name}")
+            mismatches += 1
+        parsed_path.unlink()
+    elapsed = time.perf_counter() - started
+
+    peak_mb = peak_rss_mb()
+    print(f"\n  Parsed {len(generated)} documents in {elapsed:.1f}s "
+          f"({len(generated) / elapsed:.1f} docs/s), peak RSS {peak_mb:.0f} MB")
+    print(f"  Correctness: {len(generated) - mismatches}/{len(generated)} match ground truth")
+    return mismatches == 0
+
+
+def fuzz_table(rng, n_rows):
+    """
+    Random raw Table 3: multi-line, empty, None and non-str cells, plus rows
+    of the wrong width
+    """
+    def cell(pool):
+        n_lines = rng.choice([0, 1, 1, 2, 3])
+        if n_lines == 0:
+            return rng.choice([None, ''])
+        if rng.random() < 0.002:
+            return rng.choice([0, 7, 1.5, -12, True])
+        return '\n'.join(rng.choice(pool) for _ in range(n_lines))
+
+    table = []
+    for _ in range(n_rows):
+        draw = rng.random()
+        if draw < 0.01:
+            table.append(None)
+        elif draw < 0.02:
+            table.append(['a'] * 5)
+        else:
+            table.append([cell(FUZZ_DESCRIPTIONS)] + [cell(FUZZ_AMOUNTS) for _ in range(5)])
+    return table
+
+
+def check_expansion(n_tables, seed):
+    """
+    Compare expand_table's batch path with expand_multiline_row applied row
+    by row (carrying the section) on random tables, row for row
+    """
+    rng = random.Random(seed)
+    mismatches = 0
+    for table_idx in range(n_tables):
+        table = fuzz_table(rng, rng.randrange(parse_bp.BATCH_MIN_ROWS, 4 * parse_bp.BATCH_MIN_ROWS))
+        expected = []
+        current_section = 'unknown'
+        for row_idx, row in enumerate(table):
+            if row and len(row) == 6:
+                expanded, current_section = parse_bp.expand_multiline_row(row, 'SYN', current_section, row_idx)
+                expected.extend(expanded)
+        with contextlib.redirect_stdout(io.StringIO()):
+            rows = parse_bp.expand_table(table, 'SYN').to_dict('records')
+        if rows != expected:
+            first = next((i for i, (a, b) in enumerate(zip(rows, expected)) if a != b),
+                         min(len(rows), len(expected)))
+            print(f"  MISMATCH: table {table_idx}, first differing row {first}")
+            mismatches += 1
+
+    print(f"  Expansion: {n_tables - mismatches}/{n_tables} tables match row-by-row expansion")
+    return mismatches == 0
+
+
+def main():
+    """Generate synthetic BP documents, optionally checking the parser against them"""
+    parser = argparse.ArgumentParser(description="Generate synthetic BP PDFs")
+    parser.add_argument('--documents', type=int, default=20, help="number of PDFs")
+    parser.add_argument('--pages', type=int, default=1, help="pages per PDF (first page = vue d'ensemble)")
+    parser.add_argument('--rows', type=int, default=4, help="chapter rows per section in Table 3")
+    parser.add_argument('--noise', type=float, default=0.3, help="layout noise, 0 (none) to 1")
+    parser.add_argument('--years', type=int, nargs='+', default=YEARS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--check', action='store_true', help="parse back and compare with ground truth")
+    parser.add_argument('--check-expansion', type=int, nargs='?', const=20, metavar='TABLES',
+                        help="compare batch and row-by-row expansion on random tables, then exit")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("SYNTHETIC BP GENERATOR")
+    print("=" * 70)
+
+    if args.check_expansion:
+        return check_expansion(args.check_expansion, args.seed)
+
+    started = time.perf_counter()
+    generated = generate(args.documents, args.pages, args.rows, args.noise, args.seed, args.years)
+    elapsed = time.perf_counter() - started
+    print(f"\n  ✓ Generated {len(generated)} documents in {SYNTHETIC_DIR} ({elapsed:.1f}s)")
+
+    success = check(generated) if args.check else True
+
+    print("\n" + "=" * 70)
+    return success
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
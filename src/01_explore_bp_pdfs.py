@@ -3,13 +3,17 @@
 Phase 1: Explore BP PDF structure to understand table layouts
 Examines sample pages to identify budget table formats
 Will save extracted tables as CSV files for each region
+For corpus-wide structure questions use 01a_catalog_bp_tables.py instead
 """
 
+import argparse
 import pdfplumber
 import pandas as pd
 import sys
 from pathlib import Path
 
+from pdf_memory import PAGE_WINDOW, iter_pages_bounded, page_count
+
 # Configuration
 DATA_DIR = Path(__file__).parent.parent / "data"
 BP_DIR = DATA_DIR / "Documents BP Collectivités"
@@ -22,8 +26,12 @@ SAMPLE_REGIONS = {
 }
 PDF_FILE = "BP2024.pdf"
 
-def explore_pdf(region_name, sample_pages):
-    """Explore PDF structure and table layouts for a given region"""
+def explore_pdf(region_name, sample_pages, low_memory=False, page_window=PAGE_WINDOW, max_rss_mb=None):
+    """
+    Explore PDF structure and table layouts for a given region
+    low_memory: release each page after use, reopen the PDF every
+    page_window pages and keep RSS under max_rss_mb (see pdf_memory.py)
+    """
     
     pdf_path = BP_DIR / region_name / "BP" / PDF_FILE
     
@@ -35,6 +43,18 @@ def explore_pdf(region_name, sample_pages):
     print(f"File size: {pdf_path.stat().st_size / 1024:.1f} KB")
     print(f"Sample pages: {[p+1 for p in sample_pages]}\n")
     
+    if low_memory:
+        total_pages = page_count(pdf_path)
+        print(f"Total pages in PDF: {total_pages} (low-memory mode)\n")
+        for page_idx in sample_pages:
+            if page_idx >= total_pages:
+                print(f"Page {page_idx + 1} does not exist")
+        existing = [p for p in sample_pages if p < total_pages]
+        for page_idx, page in iter_pages_bounded(pdf_path, existing, window=page_window,
+                                                 max_rss_mb=max_rss_mb):
+            explore_page(page, page_idx, region_name)
+        return True
+    
     with pdfplumber.open(pdf_path) as pdf:
         print(f"Total pages in PDF: {len(pdf.pages)}\n")
         
@@ -43,46 +63,59 @@ def explore_pdf(region_name, sample_pages):
                 print(f"Page {page_idx + 1} does not exist")
                 continue
             
-            page = pdf.pages[page_idx]
-            print(f"\n{'='*70}")
-            print(f"PAGE {page_idx + 1}")
-            print(f"{'='*70}")
-            print(f"Dimensions: {page.width:.0f}x{page.height:.0f} pt")
-            print(f"Rotation: {page.rotation}")
-            
-            # Extract text
-            text = page.extract_text()
-            if text:
-                lines = text.split('\n')[:10]
-                print(f"\nFirst 10 lines of text:")
-                for i, line in enumerate(lines, 1):
-                    print(f"  {i}: {line[:80]}")
-            
-            # Extract tables
-            tables = page.extract_tables()
-            print(f"\nTables found: {len(tables) if tables else 0}")
-            
-            if tables:
-                for t_idx, table in enumerate(tables):
-                    print(f"\n  Table {t_idx + 1}:")
-                    print(f"    Dimensions: {len(table)} rows x {len(table[0]) if table else 0} cols")
-                    if table:
-                        print(f"    First row (headers):")
-                        for i, cell in enumerate(table[0][:5]):
-                            print(f"      Col {i}: {str(cell)[:50]}")
-                        if len(table) > 1:
-                            print(f"    Second row (sample data):")
-                            for i, cell in enumerate(table[1][:5]):
-                                print(f"      Col {i}: {str(cell)[:50]}")
-                        
-                        # Save table to CSV
-                        df = pd.DataFrame(table[1:], columns=table[0])
-                        csv_filename = f"BP_2024_{region_name}_page{page_idx+1}_table{t_idx+1}.csv"
-                        csv_path = OUTPUT_DIR / csv_filename
-                        df.to_csv(csv_path, index=False, encoding='utf-8')
-                        print(f"\n    ✓ Saved to: {csv_filename}")
+            explore_page(pdf.pages[page_idx], page_idx, region_name)
+    
+    return True
+
+def explore_page(page, page_idx, region_name):
+    """Print layout of one page and save its tables as CSV"""
+    print(f"\n{'='*70}")
+    print(f"PAGE {page_idx + 1}")
+    print(f"{'='*70}")
+    print(f"Dimensions: {page.width:.0f}x{page.height:.0f} pt")
+    print(f"Rotation: {page.rotation}")
+    
+    # Extract text
+    text = page.extract_text()
+    if text:
+        lines = text.split('\n')[:10]
+        print(f"\nFirst 10 lines of text:")
+        for i, line in enumerate(lines, 1):
+            print(f"  {i}: {line[:80]}")
+    
+    # Extract tables
+    tables = page.extract_tables()
+    print(f"\nTables found: {len(tables) if tables else 0}")
+    
+    if tables:
+        for t_idx, table in enumerate(tables):
+            print(f"\n  Table {t_idx + 1}:")
+            print(f"    Dimensions: {len(table)} rows x {len(table[0]) if table else 0} cols")
+            if table:
+                print(f"    First row (headers):")
+                for i, cell in enumerate(table[0][:5]):
+                    print(f"      Col {i}: {str(cell)[:50]}")
+                if len(table) > 1:
+                    print(f"    Second row (sample data):")
+                    for i, cell in enumerate(table[1][:5]):
+                        print(f"      Col {i}: {str(cell)[:50]}")
+                
+                # Save table to CSV
+                df = pd.DataFrame(table[1:], columns=table[0])
+                csv_filename = f"BP_2024_{region_name}_page{page_idx+1}_table{t_idx+1}.csv"
+                csv_path = OUTPUT_DIR / csv_filename
+                df.to_csv(csv_path, index=False, encoding='utf-8')
+                print(f"\n    ✓ Saved to: {csv_filename}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explore BP PDF table layouts")
+    parser.add_argument('--low-memory', action='store_true',
+                        help="release pages after use and process them in fixed-size windows")
+    parser.add_argument('--page-window', type=int, default=PAGE_WINDOW)
+    parser.add_argument('--max-rss-mb', type=float, default=None,
+                        help="RSS ceiling in MB (low-memory mode)")
+    args = parser.parse_args()
+    
     print("="*70)
     print("BP PDF STRUCTURE EXPLORATION")
     print("="*70)
@@ -90,7 +123,8 @@ if __name__ == "__main__":
     all_success = True
     for region, config in SAMPLE_REGIONS.items():
         try:
-            explore_pdf(region, config["pages"])
+            explore_pdf(region, config["pages"], low_memory=args.low_memory,
+                        page_window=args.page_window, max_rss_mb=args.max_rss_mb)
         except Exception as e:
             print(f"\nERROR exploring {region}: {e}")
             all_success = False
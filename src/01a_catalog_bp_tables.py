@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Phase 1: Build a table-structure catalog of all BP PDFs
+Sweeps every page of every BP document in parallel and records a compact
+fingerprint for each table found (page, bbox, row/column counts, header hash,
+multi-line cell count, inconsistent column flag).
+
+Output: output/bp_table_catalog.json (+ .parquet when pyarrow is installed)
+Documents whose file hash is unchanged since the last run are not re-opened.
+
+Usage:
+    python src/01a_catalog_bp_tables.py              # BP documents in data/
+    python src/01a_catalog_bp_tables.py --extracted  # also output/*_extracted.pdf
+    python src/01a_catalog_bp_tables.py --workers 4 --rebuild
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from PyPDF2 import PdfReader
+
+from file_hash import file_sha256
+from pdf_memory import iter_pages_bounded
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+DATA_DIR = ROOT_DIR / "data"
+BP_DIR = DATA_DIR / "Documents BP Collectivités"
+OUTPUT_DIR = ROOT_DIR / "output"
+
+CATALOG_JSON = OUTPUT_DIR / "bp_table_catalog.json"
+CATALOG_PARQUET = OUTPUT_DIR / "bp_table_catalog.parquet"
+CATALOG_VERSION = 2
+
+# Pages per worker task: large documents are split so one 280-page BP
+# does not serialise the whole sweep
+PAGES_PER_TASK = 25
+
+
+def header_hash(row):
+    """
+    Hash of the normalised first row of a table.
+    Whitespace (including embedded newlines) is collapsed and case folded so
+    that the same header rendered slightly differently gets the same hash.
+    """
+    cells = [' '.join(str(cell).split()).casefold() if cell else '' for cell in row]
+    return hashlib.sha1('|'.join(cells).encode('utf-8')).hexdigest()[:16]
+
+
+def describe_document(path):
+    """Extract (region, year) from a BP document path"""
+    path = Path(path)
+    match = re.search(r'BP_(\d{4})_(.+)_extracted\.pdf$', path.name)
+    if match:
+        return match.group(2), int(match.group(1))
+
+    match = re.search(r'(\d{4})', path.stem)
+    year = int(match.group(1)) if match else None
+    # data/Documents BP Collectivités/<Region>/BP/BP2024.pdf
+    region = path.parent.parent.name if path.parent.name == "BP" else path.parent.name
+    return region, year
+
+
+def find_documents(include_extracted=False):
+    """List all BP PDFs to catalog, sorted for stable output"""
+    documents = []
+    if BP_DIR.exists():
+        documents.extend(BP_DIR.glob("*/BP/*.pdf"))
+    if include_extracted:
+        documents.extend(OUTPUT_DIR.glob("BP_*_extracted.pdf"))
+    return sorted(documents)
+
+
+def fingerprint_table(table, page_number, table_index):
+    """Fingerprint one pdfplumber Table found on a (1-based) page"""
+    rows = table.extract()
+    # pdfplumber pads every row to the full column grid with None, so count
+    # the cells actually present on each row
+    col_counts = sorted(set(sum(1 for cell in row if cell is not None) for row in rows))
+    multiline_cells = sum(
+        1 for row in rows for cell in row if cell and '\n' in str(cell)
+    )
+    return {
+        'page': page_number,
+        'table_index': table_index,
+        'bbox': [round(v, 1) for v in table.bbox],
+        'n_rows': len(rows),
+        'n_cols': max(col_counts) if col_counts else 0,
+        'header_hash': header_hash(rows[0]) if rows else '',
+        'header_text': ' | '.join(
+            ' '.join(str(cell).split())[:40] if cell else '' for cell in rows[0]
+        )[:200] if rows else '',
+        'multiline_cells': multiline_cells,
+        'inconsistent_cols': len(col_counts) > 1,
+    }
+
+
+def fingerprint_pages(pdf_path, first_page, last_page, max_rss_mb=None):
+    """
+    Fingerprint every table on pages [first_page, last_page) of a PDF.
+    Runs in a worker process; returns a list of plain dicts.
+    Pages are released right after use (see pdf_memory.py).
+    """
+    entries = []
+    pages = range(first_page, last_page)
+    for page_idx, page in iter_pages_bounded(pdf_path, pages, window=PAGES_PER_TASK,
+                                             max_rss_mb=max_rss_mb):
+        for table_idx, table in enumerate(page.find_tables()):
+            entries.append(fingerprint_table(table, page_idx + 1, table_idx))
+    return entries
+
+
+def load_catalog(path=CATALOG_JSON):
+    """Load the JSON catalog, or an empty one if missing/outdated"""
+    if not path.exists():
+        return {'version': CATALOG_VERSION, 'documents': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        catalog = json.load(f)
+    if catalog.get('version') != CATALOG_VERSION:
+        return {'version': CATALOG_VERSION, 'documents': {}}
+    return catalog
+
+
+def catalog_to_frame(catalog):
+    """
+    Flatten the catalog to one row per table.
+    Use this to answer corpus-wide structural questions without opening PDFs:
+        df = catalog_to_frame(load_catalog())
+        df[df.inconsistent_cols].groupby('region').size()
+    """
+    import pandas as pd
+
+    records = []
+    for doc_key, doc in catalog['documents'].items():
+        for table in doc['tables']:
+            x0, top, x1, bottom = table['bbox']
+            records.append({
+                'document': doc_key,
+                'region': doc['region'],
+                'year': doc['year'],
+                'n_pages': doc['n_pages'],
+                **{k: v for k, v in table.items() if k != 'bbox'},
+                'x0': x0, 'top': top, 'x1': x1, 'bottom': bottom,
+            })
+    df = pd.DataFrame.from_records(records)
+    if not df.empty:
+        df['year'] = df['year'].astype('Int16')
+        df['region'] = df['region'].astype('category')
+    return df
+
+
+def write_catalog(catalog):
+    """Write JSON catalog, and a Parquet copy when pyarrow is available"""
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = CATALOG_JSON.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, CATALOG_JSON)
+    print(f"  ✓ Saved: {CATALOG_JSON.name}")
+
+    try:
+        catalog_to_frame(catalog).to_parquet(CATALOG_PARQUET, index=False)
+        print(f"  ✓ Saved: {CATALOG_PARQUET.name}")
+    except ImportError:
+        print("  (pyarrow not installed - skipping Parquet copy)")
+
+
+def build_catalog(documents, workers=None, rebuild=False, max_rss_mb=None):
+    """
+    Update the catalog for the given documents.
+    Only documents whose SHA-256 changed (or new ones) are re-fingerprinted;
+    entries for documents that no longer exist are dropped.
+    """
+    catalog = {'version': CATALOG_VERSION, 'documents': {}} if rebuild else load_catalog()
+    previous = catalog['documents']
+    current = {}
+    todo = []
+
+    for pdf_path in documents:
+        doc_key = pdf_path.relative_to(ROOT_DIR).as_posix()
+        sha = file_sha256(pdf_path)
+        if doc_key in previous and previous[doc_key]['sha256'] == sha:
+            current[doc_key] = previous[doc_key]
+            continue
+        region, year = describe_document(pdf_path)
+        n_pages = len(PdfReader(str(pdf_path)).pages)
+        current[doc_key] = {
+            'sha256': sha,
+            'size': pdf_path.stat().st_size,
+            'region': region,
+            'year': year,
+            'n_pages': n_pages,
+            'tables': [],
+        }
+        todo.append((doc_key, pdf_path, n_pages))
+
+    print(f"\n{len(documents)} document(s): {len(todo)} new/changed, "
+          f"{len(documents) - len(todo)} unchanged")
+
+    failed = 0
+    if todo:
+        tasks = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for doc_key, pdf_path, n_pages in todo:
+                for start in range(0, max(n_pages, 1), PAGES_PER_TASK):
+                    future = pool.submit(fingerprint_pages, str(pdf_path), start,
+                                         min(start + PAGES_PER_TASK, n_pages), max_rss_mb)
+                    tasks[future] = doc_key
+
+            for future in as_completed(tasks):
+                doc_key = tasks[future]
+                try:
+                    current[doc_key]['tables'].extend(future.result())
+                except Exception as e:
+                    print(f"  ERROR: {doc_key}: {e}")
+                    current[doc_key]['error'] = str(e)
+                    failed += 1
+
+        for doc_key, _, _ in todo:
+            doc = current[doc_key]
+            doc['tables'].sort(key=lambda t: (t['page'], t['table_index']))
+            if 'error' in doc:
+                # Force a retry on the next run
+                doc['sha256'] = None
+            print(f"  + {doc_key}: {doc['n_pages']} pages, {len(doc['tables'])} tables")
+
+    catalog['documents'] = dict(sorted(current.items()))
+    return catalog, failed
+
+
+def main():
+    """Build or incrementally update the table catalog"""
+    parser = argparse.ArgumentParser(description="Catalog table structure of BP PDFs")
+    parser.add_argument('--extracted', action='store_true',
+                        help="also catalog output/BP_*_extracted.pdf")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: CPU count)")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="ignore the existing catalog and re-scan everything")
+    parser.add_argument('--max-rss-mb', type=float, default=None,
+                        help="per-worker RSS ceiling in MB")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("BP TABLE CATALOG")
+    print("=" * 70)
+
+    documents = find_documents(include_extracted=args.extracted)
+    if not documents:
+        print(f"ERROR: No BP PDFs found under {BP_DIR}")
+        return False
+
+    catalog, failed = build_catalog(documents, workers=args.workers, rebuild=args.rebuild,
+                                    max_rss_mb=args.max_rss_mb)
+    write_catalog(catalog)
+
+    n_tables = sum(len(doc['tables']) for doc in catalog['documents'].values())
+    print("\n" + "=" * 70)
+    print(f"Catalog: {len(catalog['documents'])} documents, {n_tables} tables, {failed} failed task(s)")
+    print("=" * 70)
+
+    return failed == 0
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Phase 4: Build the 2011-2025 regional synthesis panel (Python port of R/laurent_data.R)
+Loads RegDep20112025_Synthese.dta, melts it to a long panel, maps pre-2016
+regions to the 2016 regions and pre-aggregates (reg16, year, source, variable)
+cubes for the BP/DGCL comparison.
+
+Results are cached as typed Parquet files keyed by the SHA-256 of the .dta
+(and of the registry, which drives the remap), so the melt/remap/groupby only
+runs once per input file.
+
+Output: output/cache/synthese_panel_<hash>.parquet
+        output/cache/synthese_cube_<hash>.parquet
+        output/synthese_reg16_cube.csv (for R)
+"""
+
+import argparse
+import contextlib
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from file_hash import file_sha256
+from registry import REGISTRY_FILE, load_registry
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+DATA_DIR = ROOT_DIR / "data"
+OUTPUT_DIR = ROOT_DIR / "output"
+CACHE_DIR = OUTPUT_DIR / "cache"
+
+SYNTHESE_DTA = DATA_DIR / "Laurent" / "RegDep20112025_Synthese.dta"
+CUBE_CSV = OUTPUT_DIR / "synthese_reg16_cube.csv"
+
+# Default analysis window used in R/laurent_data.R
+YEAR_MIN = 2015
+YEAR_MAX = 2024
+
+# Pre-2016 regions are mapped to their 2016 successor by the collectivité
+# registry (config/collectivites.yaml), labelled with its synthese_name
+# ('Corse CTU', 'Réunion', ... as in R); unknown names are kept as-is.
+REGISTRY = load_registry()
+
+ID_VARS = ["Nom", "year"]
+SOURCES = ["BP", "CA"]
+# Bump when the panel/cube logic changes, to invalidate cached Parquet files
+PANEL_VERSION = 2
+
+
+def remap_categorical(values, mapping):
+    """
+    Vectorized many-to-one remap of a categorical.
+    The mapping is applied once per category (not per row), then the row
+    codes are translated with a single integer take.
+    """
+    values = values.astype('category')
+    old_categories = values.cat.categories
+    new_labels = [mapping.get(c, c) for c in old_categories]
+    new_categories = pd.Index(new_labels).unique()
+    code_map = np.append(new_categories.get_indexer(new_labels), -1)
+    # code -1 (missing) indexes the trailing -1 and stays missing
+    codes = code_map[values.cat.codes.to_numpy()]
+    return pd.Categorical.from_codes(codes, categories=new_categories)
+
+
+def melt_synthese(raw):
+    """
+    Regional rows of the synthesis file, melted to
+    (Nom, year, reg16, source, variable, value) with typed columns
+    """
+    reg = raw.loc[raw["coll"] == "Reg"].drop(columns="coll")
+    value_vars = [c for c in reg.columns if c not in ID_VARS]
+
+    long = reg.melt(id_vars=ID_VARS, value_vars=value_vars,
+                    var_name="variable", value_name="value")
+
+    # Split "<variable><BP|CA>" on the categories, not on every row.
+    # As in R, source is the last two characters of every variable, so
+    # variables without a BP/CA suffix are kept under their own "source"
+    var_cat = long["variable"].astype('category')
+    cats = var_cat.cat.categories
+    source_labels = cats.str[-2:]
+    variable_labels = cats.str.replace(r"(BP|CA)$", "", regex=True)
+    codes = var_cat.cat.codes.to_numpy()
+
+    other_sources = sorted(set(source_labels) - set(SOURCES))
+    if other_sources:
+        print(f"  Variables without a BP/CA suffix (source = last two characters): "
+              f"{sorted(cats[~source_labels.isin(SOURCES)])}")
+    source_index = pd.Index(SOURCES + other_sources)
+    long["source"] = pd.Categorical.from_codes(
+        np.append(source_index.get_indexer(source_labels), -1)[codes], categories=source_index
+    )
+    variable_index = pd.Index(variable_labels).unique()
+    long["variable"] = pd.Categorical.from_codes(
+        np.append(variable_index.get_indexer(variable_labels), -1)[codes], categories=variable_index
+    )
+
+    long["Nom"] = long["Nom"].astype('category')
+    reg16_map = REGISTRY.successor_map(long["Nom"].cat.categories, field="synthese_name")
+    long["reg16"] = remap_categorical(long["Nom"], reg16_map)
+    long["year"] = long["year"].astype('int16')
+    long["value"] = pd.to_numeric(long["value"], errors='coerce').astype('float64')
+
+    return long[["Nom", "year", "reg16", "source", "variable", "value"]].reset_index(drop=True)
+
+
+def build_cube(panel, year_min=None, year_max=None):
+    """
+    Sum the panel by (reg16, year, source, variable).
+    Like R's sum(), a group with any missing value sums to NaN.
+    """
+    if year_min is not None:
+        panel = panel[panel["year"] >= year_min]
+    if year_max is not None:
+        panel = panel[panel["year"] <= year_max]
+    grouped = panel.groupby(["reg16", "year", "source", "variable"], observed=True)["value"]
+    cube = grouped.agg(["sum", "count", "size"])
+    cube["value"] = cube["sum"].where(cube["count"] == cube["size"])
+    return cube[["value"]].reset_index()
+
+
+def load_panel(dta_path=SYNTHESE_DTA, rebuild=False):
+    """
+    Return (panel, cube) for the synthesis file, from cache when the .dta is unchanged.
+    The cube covers every year; filter on `year` for the R analysis window.
+    """
+    key = f"{PANEL_VERSION}:" + file_sha256(dta_path) + file_sha256(REGISTRY_FILE)
+    sha = hashlib.sha256(key.encode()).hexdigest()[:16]
+    panel_path = CACHE_DIR / f"synthese_panel_{sha}.parquet"
+    cube_path = CACHE_DIR / f"synthese_cube_{sha}.parquet"
+
+    if not rebuild and panel_path.exists() and cube_path.exists():
+        print(f"  ✓ Cache hit: {panel_path.name}")
+        return pd.read_parquet(panel_path), pd.read_parquet(cube_path)
+
+    print(f"  Reading: {dta_path.name}")
+    raw = pd.read_stata(dta_path, convert_categoricals=False)
+    panel = melt_synthese(raw)
+    cube = build_cube(panel)
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for path, frame in ((panel_path, panel), (cube_path, cube)):
+        # Written aside and renamed, so an interrupted run never leaves a
+        # truncated file under a valid cache key
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    # Drop caches built from previous versions of the .dta
+    for old in CACHE_DIR.glob("synthese_*.parquet"):
+        if old not in (panel_path, cube_path):
+            with contextlib.suppress(FileNotFoundError):
+                old.unlink()
+    print(f"  ✓ Cached: {panel_path.name} ({len(panel)} rows)")
+    print(f"  ✓ Cached: {cube_path.name} ({len(cube)} rows)")
+
+    return panel, cube
+
+
+def main():
+    """Build (or load) the panel and export the reg16 cube for R"""
+    parser = argparse.ArgumentParser(description="Build the 2011-2025 regional synthesis panel")
+    parser.add_argument('--rebuild', action='store_true', help="ignore the cache")
+    parser.add_argument('--year-min', type=int, default=YEAR_MIN)
+    parser.add_argument('--year-max', type=int, default=YEAR_MAX)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("SYNTHESE PANEL BUILDER")
+    print("=" * 70)
+
+    if not SYNTHESE_DTA.exists():
+        print(f"ERROR: File not found at {SYNTHESE_DTA}")
+        return False
+
+    panel, cube = load_panel(rebuild=args.rebuild)
+
+    window = cube[(cube["year"] >= args.year_min) & (cube["year"] <= args.year_max)]
+    window.to_csv(CUBE_CSV, index=False, encoding='utf-8')
+    print(f"  ✓ Saved: {CUBE_CSV.name} ({args.year_min}-{args.year_max}, {len(window)} rows)")
+
+    unmapped = sorted(n for n in panel["Nom"].cat.categories if REGISTRY.resolve(n) is None)
+    if unmapped:
+        print(f"  Names kept as-is (not in the registry): {unmapped}")
+
+    print("\n" + "=" * 70)
+    print(f"Panel: {len(panel)} rows, {panel['reg16'].nunique()} reg16 regions, "
+          f"years {panel['year'].min()}-{panel['year'].max()}")
+    print("=" * 70)
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
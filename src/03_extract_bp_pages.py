@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Phase 2: Extract specific pages from BP PDFs
-Extracts pages based on page ranges from regions_config.yaml
+Extracts pages based on the per-year page ranges in regions_config.yaml
 Uses PyPDF2 to extract and save individual page ranges per region
 """
 
@@ -10,6 +10,8 @@ from pathlib import Path
 from PyPDF2 import PdfReader, PdfWriter
 import sys
 
+from registry import load_registry
+
 # Configuration
 DATA_DIR = Path(__file__).parent.parent / "data"
 BP_DIR = DATA_DIR / "Documents BP Collectivités"
@@ -19,18 +21,46 @@ OUTPUT_DIR = Path(__file__).parent.parent / "output"
 REGIONS_CONFIG = CONFIG_DIR / "regions_config.yaml"
 PDF_FILE = "BP2024.pdf"
 
+# Folder and official names come from the collectivité registry
+REGISTRY = load_registry()
+
 def load_regions_config():
-    """Load regions configuration from YAML"""
+    """
+    Load regions configuration from YAML, with folder_name and official_name
+    filled in from config/collectivites.yaml
+    """
     with open(REGIONS_CONFIG, 'r', encoding='utf-8') as f:
         config = yaml.safe_load(f)
-    return config['regions']
+    
+    regions = {}
+    for region_key, region_config in config['regions'].items():
+        if region_key == 'note':
+            continue
+        entity = REGISTRY.resolve(region_key)
+        if entity is None or not entity.get('folder_name'):
+            raise ValueError(f"{region_key!r} in {REGIONS_CONFIG.name} is not a BP région "
+                             f"of collectivites.yaml")
+        regions[region_key] = {**region_config, 'folder_name': entity['folder_name'],
+                               'official_name': entity['name']}
+    return regions
+
+def page_range(region_config, year):
+    """(pages_start, pages_end) configured for a BP year, or None"""
+    pages = (region_config.get('pages') or {}).get(int(year))
+    if not pages:
+        return None
+    pages_start, pages_end = pages
+    return pages_start, pages_end
 
 def extract_pages(region_key, region_config, year="2024"):
     """Extract specific pages from a region's BP PDF"""
     
     region_name = region_config['folder_name']
-    pages_start = region_config['pages_start']
-    pages_end = region_config['pages_end']
+    pages = page_range(region_config, year)
+    if pages is None:
+        print(f"ERROR: No {year} page range for {region_name} in {REGIONS_CONFIG.name}")
+        return False
+    pages_start, pages_end = pages
     
     pdf_path = BP_DIR / region_name / "BP" / f"BP{year}.pdf"
     
@@ -96,9 +126,6 @@ def main():
     fail_count = 0
     
     for region_key, region_config in regions_config.items():
-        if region_key == 'note':
-            continue
-        
         if extract_pages(region_key, region_config):
             success_count += 1
         else:
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 Phase 2: Merge extracted PDF pages
-Consolidates extracted pages from multiple regions into two consolidated PDFs based on groupes_BP_regions.txt
+Consolidates extracted pages from multiple regions into two consolidated PDFs based on
+the bp_group of each region in config/collectivites.yaml (formerly groupes_BP_regions.txt)
 Uses PyPDF2 to merge PDFs
 """
 
@@ -10,49 +11,15 @@ from PyPDF2 import PdfReader, PdfWriter
 import sys
 import re
 
+from registry import fold_name, load_registry
+
 # Configuration
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
 CONFIG_DIR = Path(__file__).parent.parent / "config"
-GROUPES_FILE = Path(__file__).parent.parent / "groupes_BP_regions.txt"
 YEAR = "2024"
 
-# Region name mappings from config (for matching with filenames)
-REGION_NAMES_MAP = {
-    "Auvergne Rhone Alpes": "Auvergne-Rhone-Alpes",
-    "Bourgogne Franche Comté": "Bourgogne-Franche-Comté",
-    "Bretagne": "Bretagne",
-    "Centre VdL": "Centre",
-    "Grand Est": "Grand Est",
-    "Hauts de France": "HdF",
-    "Ile de France": "IdF",
-    "Normandie": "Normandie",
-    "Nouvelle Aquitaine": "Nouvelle-Aquitaine",
-    "Occitanie": "Occitanie",
-    "Provence Alpes Cote d'Azur": "PACA"
-}
-
-def parse_groupes_file():
-    """Parse groupes_BP_regions.txt to get region -> group mapping"""
-    region_groups = {}
-    
-    try:
-        with open(GROUPES_FILE, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-                if not line:
-                    continue
-                # Format: "Region Name GroupNumber"
-                parts = line.rsplit(' ', 1)  # Split from right to get last space
-                if len(parts) == 2:
-                    region_name, group_num = parts
-                    region_name = region_name.strip()
-                    group_num = group_num.strip()
-                    region_groups[region_name] = group_num
-    except FileNotFoundError:
-        print(f"ERROR: {GROUPES_FILE} not found")
-        return {}
-    
-    return region_groups
+# Region names and consolidation groups come from config/collectivites.yaml
+REGISTRY = load_registry()
 
 def get_region_from_filename(filename):
     """Extract region name from filename like 'BP_2024_Auvergne-Rhone-Alpes_extracted.pdf'"""
@@ -66,11 +33,6 @@ def merge_extracted_pages(year=YEAR):
     
     print(f"\nMerging extracted pages by group for year {year}...")
     
-    # Load region -> group mapping
-    region_groups = parse_groupes_file()
-    if not region_groups:
-        return False
-    
     # Group extracted PDFs by their group number (1 or 2)
     group_pdfs = {1: [], 2: []}
     
@@ -79,16 +41,11 @@ def merge_extracted_pages(year=YEAR):
         if not filename_region:
             continue
         
-        # Find matching region in groupes mapping
-        matching_region = None
-        for config_region, file_region in REGION_NAMES_MAP.items():
-            if file_region == filename_region:
-                matching_region = config_region
-                break
+        # Constant-time lookup of the region (folder name or any alias)
+        region = REGISTRY.resolve(filename_region)
         
-        if matching_region and matching_region in region_groups:
-            group_num = int(region_groups[matching_region])
-            group_pdfs[group_num].append((pdf_file, matching_region))
+        if region and region.get('bp_group') in group_pdfs:
+            group_pdfs[region['bp_group']].append((pdf_file, region['name']))
         else:
             print(f"WARNING: Could not find group for {filename_region}")
     
@@ -116,7 +73,7 @@ def merge_extracted_pages(year=YEAR):
             total_pages = 0
             
             # Merge all PDFs for this group
-            for pdf_file, region_name in sorted(pdf_list, key=lambda x: x[1]):
+            for pdf_file, region_name in sorted(pdf_list, key=lambda x: fold_name(x[1])):
                 with open(pdf_file, 'rb') as f:
                     reader = PdfReader(f)
                     for page in reader.pages:
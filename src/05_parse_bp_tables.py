@@ -7,16 +7,45 @@ Output: Semicolon-delimited CSV for French Excel compatibility
 Test mode: Auvergne-Rhone-Alpes and Bretagne only
 """
 
+import argparse
+from itertools import chain
+import numpy as np
+import pandas as pd
 import pdfplumber
 from pathlib import Path
 import sys
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+from pdf_memory import iter_pages_bounded, page_count
+from registry import load_registry
+
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
 YEAR = "2024"
 
-ALL_REGIONS = [
-    "Auvergne-Rhone-Alpes", "Bourgogne-Franche-Comté", "Bretagne", "Centre",
-    "Grand Est", "HdF", "IdF", "Normandie", "Nouvelle-Aquitaine", "Occitanie", "PACA"
+# Folder names of the regions in config/collectivites.yaml
+REGISTRY = load_registry()
+ALL_REGIONS = REGISTRY.folder_names()
+
+# Characters removed by str.strip(), for the vectorised clean_text / clean_number
+STRIP_CHARS = ''.join(chr(c) for c in range(0x3001) if chr(c).isspace())  # U+3000 is the last
+COMMA_TO_DOT = bytes.maketrans(b',', b'.')
+# Below this many rows the per-call kernel overhead outweighs batching
+# (measured crossover: ~300 rows)
+BATCH_MIN_ROWS = 500
+
+# Values of the categorical section / row_type columns
+SECTIONS = ['unknown', 'investment_expense', 'investment_revenue', 'operating_expense', 'operating_revenue']
+ROW_TYPES = ['data', 'section_header']
+
+OUTPUT_COLUMNS = [
+    'region', 'section', 'row_type', 'level', 'row_index',
+    'description', 'budget_anterieur', 'restes_a_realiser_n1',
+    'propositions_nouvelles', 'vote_assemblee', 'total_budget'
 ]
 
 
@@ -77,6 +106,8 @@ def determine_section(description_text):
 def expand_multiline_row(row, region, current_section, row_index):
     """
     Expand a row with multi-line cells into multiple rows.
+    Row-at-a-time reference for expand_table (also its path for small
+    tables).
     
     Input row: 6 cells, some may contain newlines
     Returns: list of expanded row dicts
@@ -158,54 +189,219 @@ def expand_multiline_row(row, region, current_section, row_index):
     return expanded_rows, current_section
 
 
-def parse_pdf_to_rows(pdf_path, region):
+def expand_table(data_table, region, as_frame=True):
+    """
+    Expand a whole raw table at once (same rows as expand_multiline_row
+    applied row by row, carrying the section across rows).
+    Cells are split on newlines in one pass, the lines are scattered into a
+    (row, line) grid padded with '', and the section is a forward-fill of the
+    section header lines. String work runs in pyarrow kernels; small tables
+    (under BATCH_MIN_ROWS), as_frame=False (building row dicts from a frame
+    costs more than the row loop itself) or a missing pyarrow fall back to
+    expanding rows one at a time.
+    
+    Rows without exactly 6 cells are skipped (with a warning).
+    Returns a DataFrame with OUTPUT_COLUMNS (categorical region/section/row_type,
+    integer level/row_index), or a list of row dicts with as_frame=False.
+    """
+    valid_rows = []
+    row_indices = []
+    for row_idx, row in enumerate(data_table):
+        if not row or len(row) != 6:
+            print(f"  WARNING: Skipping row {row_idx} - expected 6 cols, got {len(row) if row else 0}")
+            continue
+        valid_rows.append(row)
+        row_indices.append(row_idx)
+    
+    if pa is None or not as_frame or len(valid_rows) < BATCH_MIN_ROWS:
+        rows = []
+        current_section = 'unknown'
+        for row, row_idx in zip(valid_rows, row_indices):
+            expanded, current_section = expand_multiline_row(row, region, current_section, row_idx)
+            rows.extend(expanded)
+        return _rows_frame(rows) if as_frame else rows
+    
+    # All cells in one array, column-major: [descriptions..., budget_anterieur..., ...]
+    # Empty/None cells behave as '' (as in expand_multiline_row)
+    n_rows = len(valid_rows)
+    flat = list(chain.from_iterable(valid_rows))
+    try:
+        flat = pa.array(flat, pa.string())
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # Non-str cells (numbers from other extractors): str() them as the row
+        # loop does, falsy ones (0, False) becoming ''
+        flat = pa.array([cell if isinstance(cell, str) else (str(cell) if cell else '') for cell in flat],
+                        pa.string())
+    flat = flat.fill_null('')
+    cells = flat.take(pa.array(np.arange(6 * n_rows).reshape(n_rows, 6).T.ravel()))
+    # clean_number's space removal and decimal comma, applied before splitting
+    # (removing ' ' commutes with strip(), and neither touches '\n')
+    cells = pa.concat_arrays([cells.slice(0, n_rows), _clean_numbers(cells.slice(n_rows))])
+    
+    # A row is expanded only when its description spans several lines;
+    # only the cells of those rows are split
+    multi = pc.match_substring(cells.slice(0, n_rows), '\n').to_numpy(zero_copy_only=False)
+    multi_rows = np.flatnonzero(multi)
+    single_rows = np.flatnonzero(~multi)
+    all_columns = np.arange(6)[:, None]
+    parts = pc.split_pattern(cells.take(pa.array((all_columns * n_rows + multi_rows).ravel())), '\n')
+    n_parts = pc.list_value_length(parts).to_numpy().reshape(6, len(multi_rows))
+    n_lines = np.ones(n_rows, dtype=np.int64)
+    n_lines[multi_rows] = n_parts.max(axis=0, initial=1)
+    
+    # (row, line) grid: one slot per expanded line, per column
+    row_start = np.concatenate(([0], np.cumsum(n_lines)[:-1]))
+    total = int(n_lines.sum())
+    row_pos = np.repeat(np.arange(n_rows), n_lines)
+    line_no = np.arange(total) - row_start[row_pos]
+    
+    # Each slot takes from [lines..., whole cells..., '']: lines of multi-line
+    # rows, the unsplit cell for single-line rows, '' for padding
+    lines = pc.list_flatten(parts)
+    parent = pc.list_parent_indices(parts).to_numpy()
+    column, row = np.divmod(parent, max(len(multi_rows), 1))
+    line = np.arange(len(lines)) - parts.offsets.to_numpy()[parent]
+    source = np.full(6 * total, len(lines) + len(cells))
+    source[column * total + row_start[multi_rows[row]] + line] = np.arange(len(lines))
+    source[(all_columns * total + row_start[single_rows]).ravel()] = (
+        len(lines) + (all_columns * n_rows + single_rows).ravel()
+    )
+    pool = pa.concat_arrays([lines, cells, pa.array([''], pa.string())])
+    grid = pc.utf8_trim(pc.take(pool, source), STRIP_CHARS)
+    grid = [grid.slice(col * total, total) for col in range(6)]
+    
+    # clean_text on the description
+    description = grid[0]
+    description = pc.if_else(
+        pc.starts_with(description, '='),
+        pc.utf8_trim(pc.utf8_slice_codeunits(description, 1), STRIP_CHARS),
+        description,
+    )
+    
+    # determine_section on level-0 lines only, as codes into SECTIONS
+    header_code = _section_codes(pc.take(grid[0], pa.array(row_start)))
+    
+    is_header = np.zeros(total, dtype=bool)
+    is_header[row_start] = header_code > 0
+    codes = np.zeros(total, dtype=np.int64)
+    codes[row_start] = header_code
+    # Forward-fill: every line takes the code of the last header at or before it
+    last_header = np.maximum.accumulate(np.where(is_header, np.arange(total), 0))
+    
+    expanded = pd.DataFrame({
+        'region': pd.Categorical.from_codes(np.zeros(total, dtype=np.int64), [region]),
+        'section': pd.Categorical.from_codes(codes[last_header], SECTIONS),
+        'row_type': pd.Categorical.from_codes(is_header.astype(np.int64), ROW_TYPES),
+        'level': (line_no > 0).astype(np.int64),
+        'row_index': np.asarray(row_indices, dtype=np.int64)[row_pos],
+        'description': description.to_pandas(),
+    })
+    for name, values in zip(OUTPUT_COLUMNS[6:], grid[1:]):
+        expanded[name] = values.to_pandas()
+    
+    return _typed_frame(expanded)
+
+
+def _utf8_bytes(values):
+    """
+    UTF-8 bytes of a pyarrow string array (no nulls), strings back to back,
+    and their offsets into those bytes
+    """
+    _, offset_buffer, data_buffer = values.buffers()
+    offsets = np.frombuffer(offset_buffer, dtype=np.int32)[values.offset:values.offset + len(values) + 1]
+    data = bytes(memoryview(data_buffer)[offsets[0]:offsets[-1]]) if data_buffer else b''
+    return data, offsets - offsets[0]
+
+
+def _section_codes(lines):
+    """determine_section over a pyarrow string array, as codes into SECTIONS"""
+    # utf8_upper only differs from str.upper() on characters that upper-case to
+    # several (ß -> SS, ligatures), none of which can spell DEPENSES or RECETTES,
+    # so this selects every possible header; determine_section decides
+    candidates = pc.match_substring_regex(pc.utf8_upper(lines), "DEPENSES|RECETTES")
+    candidates = np.flatnonzero(candidates.to_numpy(zero_copy_only=False))
+    codes = np.zeros(len(lines), dtype=np.int64)
+    codes[candidates] = [SECTIONS.index(determine_section(line)[0])
+                         for line in lines.take(pa.array(candidates)).to_pylist()]
+    return codes
+
+
+def _clean_numbers(values):
+    """
+    Remove spaces and turn decimal commas into dots in a whole pyarrow string
+    array, on its UTF-8 bytes: ' ' and ',' are single bytes that never occur
+    inside a multi-byte character, so only the offsets need adjusting.
+    """
+    data, offsets = _utf8_bytes(values)
+    spaces = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord(' '))
+    offsets = (offsets - np.searchsorted(spaces, offsets)).astype(np.int32)
+    data = data.translate(COMMA_TO_DOT, b' ')
+    return pa.StringArray.from_buffers(len(values), pa.py_buffer(offsets), pa.py_buffer(data))
+
+
+def _typed_frame(expanded):
+    """Categorical labels and integer positions"""
+    return expanded.astype({
+        'region': 'category',
+        'section': pd.CategoricalDtype(SECTIONS),
+        'row_type': pd.CategoricalDtype(ROW_TYPES),
+        'level': 'int64',
+        'row_index': 'int64',
+    })
+
+
+def _rows_frame(rows):
+    """Row dicts as a DataFrame typed like _typed_frame, built column by column"""
+    if not rows:
+        return _typed_frame(pd.DataFrame([], columns=OUTPUT_COLUMNS))
+    columns = {col: [row[col] for row in rows] for col in OUTPUT_COLUMNS}
+    return pd.DataFrame({
+        **columns,
+        'region': pd.Categorical(columns['region']),
+        'section': pd.Categorical(columns['section'], categories=SECTIONS),
+        'row_type': pd.Categorical(columns['row_type'], categories=ROW_TYPES),
+        'level': np.array(columns['level'], dtype=np.int64),
+        'row_index': np.array(columns['row_index'], dtype=np.int64),
+    })
+
+
+def _csv_lines(frame):
+    """write_csv's data lines for a DataFrame, built column by column"""
+    table = pa.Table.from_pandas(frame[OUTPUT_COLUMNS], preserve_index=False).combine_chunks()
+    fields = []
+    for col in OUTPUT_COLUMNS:
+        values = pc.cast(table[col].chunk(0) if table.num_rows else pa.array([], pa.string()), pa.string())
+        # Escape semicolons in values if present
+        has_semicolon = pc.match_substring(values, ';')
+        if pc.any(has_semicolon).as_py():
+            values = pc.if_else(has_semicolon, pc.binary_join_element_wise('"', values, '"', ''), values)
+        fields.append(values)
+    lines = pc.binary_join_element_wise(pc.binary_join_element_wise(*fields, ';'), '', '\n')
+    return _utf8_bytes(lines)[0].decode('utf-8')
+
+
+def parse_pdf_to_rows(pdf_path, region, low_memory=False, max_rss_mb=None, as_frame=False):
     """
     Parse PDF Table 3, expand multi-line cells, return list of row dicts
+    (or the expand_table DataFrame with as_frame=True)
+    low_memory: release the page's cached layout objects as soon as the
+    table is extracted and enforce max_rss_mb (see pdf_memory.py)
     """
     print(f"\nParsing: {region}")
     print(f"  File: {pdf_path.name}")
     
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            if not pdf.pages:
+        if low_memory:
+            if page_count(pdf_path) == 0:
                 print("  ERROR: No pages in PDF")
                 return None
-            
-            page = pdf.pages[0]
-            tables = page.extract_tables()
-            
-            if not tables or len(tables) < 4:
-                print(f"  ERROR: Expected 4 tables, found {len(tables) if tables else 0}")
-                return None
-            
-            # Table 3 is the main budget data
-            data_table = tables[3]
-            if not data_table:
-                print("  ERROR: Table 3 is empty")
-                return None
-            
-            print(f"  Found {len(data_table)} rows in Table 3")
-            
-            all_rows = []
-            current_section = 'unknown'
-            
-            for row_idx, row in enumerate(data_table):
-                if not row or len(row) != 6:
-                    print(f"  WARNING: Skipping row {row_idx} - expected 6 cols, got {len(row) if row else 0}")
-                    continue
-                
-                expanded, current_section = expand_multiline_row(
-                    row, region, current_section, row_idx
-                )
-                all_rows.extend(expanded)
-            
-            print(f"  ✓ Expanded to {len(all_rows)} rows")
-            
-            # Count sections
-            sections = set(r['section'] for r in all_rows)
-            print(f"  ✓ Sections found: {sorted(sections)}")
-            
-            return all_rows
+            rows = None
+            for _, page in iter_pages_bounded(pdf_path, [0], window=1, max_rss_mb=max_rss_mb):
+                rows = parse_page(page, region, as_frame=as_frame)
+            return rows
+        
+        with pdfplumber.open(pdf_path) as pdf:
+            return parse_document(pdf, region, as_frame=as_frame)
             
     except Exception as e:
         print(f"  ERROR: {e}")
@@ -214,15 +410,65 @@ def parse_pdf_to_rows(pdf_path, region):
         return None
 
 
+def parse_document(pdf, region, as_frame=False):
+    """
+    Parse Table 3 of an already open pdfplumber document.
+    Returns list of row dicts (DataFrame with as_frame=True), or None if the
+    expected table is missing.
+    """
+    if not pdf.pages:
+        print("  ERROR: No pages in PDF")
+        return None
+    
+    return parse_page(pdf.pages[0], region, as_frame=as_frame)
+
+
+def parse_page(page, region, as_frame=False):
+    """
+    Parse Table 3 of a pdfplumber page (the first page of an extracted BP).
+    Returns list of row dicts (DataFrame with as_frame=True), or None if the
+    expected table is missing.
+    """
+    tables = page.extract_tables()
+    
+    if not tables or len(tables) < 4:
+        print(f"  ERROR: Expected 4 tables, found {len(tables) if tables else 0}")
+        return None
+    
+    # Table 3 is the main budget data
+    data_table = tables[3]
+    if not data_table:
+        print("  ERROR: Table 3 is empty")
+        return None
+    
+    print(f"  Found {len(data_table)} rows in Table 3")
+    
+    expanded = expand_table(data_table, region, as_frame=as_frame)
+    
+    print(f"  ✓ Expanded to {len(expanded)} rows")
+    
+    # Count sections
+    sections = set(expanded['section']) if as_frame else {row['section'] for row in expanded}
+    print(f"  ✓ Sections found: {sorted(sections)}")
+    
+    return expanded
+
+
 def write_csv(rows, output_path):
     """
-    Write rows to CSV with semicolon delimiter
+    Write rows (list of dicts, or an expand_table DataFrame) to CSV with
+    semicolon delimiter
     """
-    columns = [
-        'region', 'section', 'row_type', 'level', 'row_index',
-        'description', 'budget_anterieur', 'restes_a_realiser_n1',
-        'propositions_nouvelles', 'vote_assemblee', 'total_budget'
-    ]
+    columns = OUTPUT_COLUMNS
+    
+    if isinstance(rows, pd.DataFrame):
+        if pa is not None:
+            with open(output_path, 'w', encoding='utf-8-sig') as f:
+                f.write(';'.join(columns) + '\n')
+                f.write(_csv_lines(rows))
+            print(f"  ✓ Saved: {output_path.name}")
+            return
+        rows = rows.to_dict('records')
     
     with open(output_path, 'w', encoding='utf-8-sig') as f:
         # Write header
@@ -242,11 +488,13 @@ def write_csv(rows, output_path):
     print(f"  ✓ Saved: {output_path.name}")
 
 
-def main(regions=None):
+def main(regions=None, low_memory=False, max_rss_mb=None):
     """
     Parse specified regions (or all if None).
     Args:
         regions: list of region names, or None to use ALL_REGIONS
+        low_memory: bounded-memory page handling (see pdf_memory.py)
+        max_rss_mb: RSS ceiling in MB for low-memory mode
     """
     if regions is None:
         regions = ALL_REGIONS
@@ -268,9 +516,10 @@ def main(regions=None):
             failed += 1
             continue
         
-        rows = parse_pdf_to_rows(pdf_path, region)
+        rows = parse_pdf_to_rows(pdf_path, region, low_memory=low_memory, max_rss_mb=max_rss_mb,
+                                 as_frame=True)
         
-        if rows:
+        if rows is not None and len(rows):
             output_path = OUTPUT_DIR / f"BP_{YEAR}_{region}.csv"
             write_csv(rows, output_path)
             success += 1
@@ -286,15 +535,25 @@ def main(regions=None):
 
 if __name__ == "__main__":
     # Allow specifying regions via command line: python script.py region1 region2 ...
-    regions_to_process = sys.argv[1:] if len(sys.argv) > 1 else None
+    parser = argparse.ArgumentParser(description="Parse Table 3 of extracted BP PDFs")
+    parser.add_argument('regions', nargs='*', help="region names (default: all)")
+    parser.add_argument('--low-memory', action='store_true',
+                        help="release page caches right after use")
+    parser.add_argument('--max-rss-mb', type=float, default=None,
+                        help="RSS ceiling in MB (low-memory mode)")
+    args = parser.parse_args()
+    regions_to_process = args.regions or None
     
     if regions_to_process:
-        # Validate requested regions
-        invalid = [r for r in regions_to_process if r not in ALL_REGIONS]
+        # Accept any known spelling ("Hauts-de-France", "hdf", ...) and map it to the folder name
+        resolved = [REGISTRY.resolve(r) for r in regions_to_process]
+        invalid = [r for r, e in zip(regions_to_process, resolved)
+                   if not e or e.get('folder_name') not in ALL_REGIONS]
+        regions_to_process = [e['folder_name'] for e in resolved if e and e.get('folder_name')]
         if invalid:
             print(f"ERROR: Unknown regions: {invalid}")
             print(f"Valid regions: {', '.join(ALL_REGIONS)}")
             sys.exit(1)
     
-    success = main(regions_to_process)
+    success = main(regions_to_process, low_memory=args.low_memory, max_rss_mb=args.max_rss_mb)
     sys.exit(0 if success else 1)
@@ -2,6 +2,7 @@
 """
 Diagnostic script to inspect table structure in BP PDFs
 Helps understand what tables exist and their structure before parsing
+For corpus-wide structure questions use 01a_catalog_bp_tables.py instead
 """
 
 import pdfplumber
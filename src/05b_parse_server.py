@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Optional warm parsing server for interactive R sessions
+Keeps the parser imported and recently used pdfplumber documents open in an
+LRU, and caches parse results until the underlying PDF changes on disk.
+Serves JSON (default) or Arrow IPC (format=arrow) on localhost.
+
+Endpoints (GET):
+    /health
+    /parse?region=Bretagne[&year=2024][&format=arrow]
+    /inspect?region=Bretagne[&page=1]
+    /query?region=Bretagne[&section=operating_revenue][&row_type=data][&q=texte]
+
+Usage:
+    python src/05b_parse_server.py [--port 8765] [--max-open 8]
+
+From R:
+    d = jsonlite::fromJSON("http://127.0.0.1:8765/parse?region=Bretagne")
+    d = arrow::read_ipc_stream("http://127.0.0.1:8765/parse?region=Bretagne&format=arrow")
+"""
+
+import argparse
+import importlib
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pdfplumber
+
+sys.path.insert(0, str(Path(__file__).parent))
+parse_bp = importlib.import_module("05_parse_bp_tables")
+catalog_bp = importlib.import_module("01a_catalog_bp_tables")
+
+OUTPUT_DIR = parse_bp.OUTPUT_DIR
+YEAR = parse_bp.YEAR
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_OPEN = 8
+
+YEAR_PATTERN = re.compile(r'\d{4}')
+INTEGER_PATTERN = re.compile(r'-?\d+')
+INTEGER_PARAMS = ('page', 'level')
+
+
+def file_signature(path):
+    """(mtime_ns, size) - changes whenever the file is rewritten"""
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DocumentCache:
+    """
+    LRU of open pdfplumber documents plus per-document result cache.
+    Entries are keyed by path and dropped when the file signature changes.
+    pdfplumber documents are not thread-safe, so each entry has its own lock:
+    requests on different documents run in parallel, requests on the same
+    document are serialised. The cache lock only guards the LRU itself.
+    """
+
+    def __init__(self, max_open=DEFAULT_MAX_OPEN):
+        self.max_open = max_open
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # path -> {'signature', 'lock', 'pdf', 'results', 'closed'}
+
+    def _entry(self, path):
+        """
+        Return a fresh LRU entry for path (caller holds self.lock), plus the
+        entries it displaced, to be closed once the lock is released
+        """
+        signature = file_signature(path)
+        displaced = []
+        entry = self.entries.get(path)
+        if entry is not None and entry['signature'] != signature:
+            displaced.append(self.entries.pop(path))
+            entry = None
+
+        if entry is None:
+            entry = {'signature': signature, 'lock': threading.Lock(), 'pdf': None,
+                     'results': {}, 'closed': False}
+            self.entries[path] = entry
+            while len(self.entries) > self.max_open:
+                displaced.append(self.entries.popitem(last=False)[1])
+        else:
+            self.entries.move_to_end(path)
+        return entry, displaced
+
+    @staticmethod
+    def _close(entry):
+        """Close an entry's document once no request is using it"""
+        with entry['lock']:
+            entry['closed'] = True
+            if entry['pdf'] is not None:
+                entry['pdf'].close()
+                entry['pdf'] = None
+
+    def get(self, path, key, compute):
+        """Return cached result `key` for path, computing compute(pdf) on a miss"""
+        while True:
+            with self.lock:
+                entry, displaced = self._entry(path)
+            for old in displaced:
+                self._close(old)
+
+            with entry['lock']:
+                if entry['closed']:
+                    # Evicted between lookup and use: look it up again
+                    continue
+                if key not in entry['results']:
+                    if entry['pdf'] is None:
+                        entry['pdf'] = pdfplumber.open(path)
+                    entry['results'][key] = compute(entry['pdf'])
+                return entry['results'][key]
+
+    def close(self):
+        with self.lock:
+            entries = list(self.entries.values())
+            self.entries.clear()
+        for entry in entries:
+            self._close(entry)
+
+
+class PageOutOfRange(ValueError):
+    """Requested page does not exist in the document (a client error)"""
+
+
+def inspect_page(pdf, page_number):
+    """Table fingerprints of one (1-based) page, same fields as the catalog"""
+    if page_number < 1 or page_number > len(pdf.pages):
+        raise PageOutOfRange(f"page {page_number} out of range (1-{len(pdf.pages)})")
+    page = pdf.pages[page_number - 1]
+    return [catalog_bp.fingerprint_table(table, page_number, idx)
+            for idx, table in enumerate(page.find_tables())]
+
+
+def query_rows(rows, params):
+    """Filter parsed rows on section / row_type / level and a description substring"""
+    result = rows
+    for field in ('section', 'row_type'):
+        if field in params:
+            result = [r for r in result if r[field] == params[field]]
+    if 'level' in params:
+        level = int(params['level'])
+        result = [r for r in result if r['level'] == level]
+    if 'q' in params:
+        needle = params['q'].casefold()
+        result = [r for r in result if needle in r['description'].casefold()]
+    return result
+
+
+def rows_to_arrow(rows):
+    """Serialise rows to an Arrow IPC stream (requires pyarrow)"""
+    import pyarrow as pa
+
+    columns = {col: [row[col] for row in rows] for col in parse_bp.OUTPUT_COLUMNS}
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class ParseHandler(BaseHTTPRequestHandler):
+    """HTTP handler; the DocumentCache is attached to the server"""
+
+    def do_GET(self):
+        started = time.perf_counter()
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        try:
+            if url.path == '/health':
+                self._send_json({'status': 'ok', 'open_documents': len(self.server.cache.entries)})
+                return
+            if url.path not in ('/parse', '/inspect', '/query'):
+                self._send_json({'error': f"unknown endpoint {url.path}"}, status=404)
+                return
+
+            # Any known spelling of the region is accepted
+            entity = parse_bp.REGISTRY.resolve(params.get('region', ''))
+            region = entity.get('folder_name') if entity else None
+            if region not in parse_bp.ALL_REGIONS:
+                self._send_json({'error': f"unknown region {params.get('region')!r}",
+                                 'valid_regions': parse_bp.ALL_REGIONS}, status=400)
+                return
+            year = params.get('year', YEAR)
+            if not YEAR_PATTERN.fullmatch(year):
+                self._send_json({'error': f"invalid year {year!r} (expected YYYY)"}, status=400)
+                return
+            for field in INTEGER_PARAMS:
+                if field in params and not INTEGER_PATTERN.fullmatch(params[field]):
+                    self._send_json({'error': f"invalid {field} {params[field]!r} (expected an integer)"},
+                                    status=400)
+                    return
+            pdf_path = OUTPUT_DIR / f"BP_{year}_{region}_extracted.pdf"
+            if not pdf_path.exists():
+                self._send_json({'error': f"PDF not found: {pdf_path.name}"}, status=404)
+                return
+
+            if url.path == '/inspect':
+                page_number = int(params.get('page', 1))
+                result = self.server.cache.get(
+                    pdf_path, ('inspect', page_number), lambda pdf: inspect_page(pdf, page_number)
+                )
+            else:
+                rows = self.server.cache.get(
+                    pdf_path, ('parse',), lambda pdf: parse_bp.parse_document(pdf, region)
+                )
+                if rows is None:
+                    self._send_json({'error': f"could not parse Table 3 for {region}"}, status=422)
+                    return
+                result = query_rows(rows, params) if url.path == '/query' else rows
+
+            if params.get('format') == 'arrow' and url.path != '/inspect':
+                self._send(rows_to_arrow(result), 'application/vnd.apache.arrow.stream')
+            else:
+                self._send_json(result)
+
+        except PageOutOfRange as e:
+            self._send_json({'error': str(e)}, status=400)
+        except Exception as e:
+            self._send_json({'error': str(e)}, status=500)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"  {url.path} {params} {elapsed_ms:.1f} ms")
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self._send(body, 'application/json; charset=utf-8', status)
+
+    def _send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Timing line printed in do_GET replaces the default access log
+        pass
+
+
+def main():
+    """Run the server until interrupted"""
+    parser = argparse.ArgumentParser(description="Warm BP parsing server")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-open', type=int, default=DEFAULT_MAX_OPEN,
+                        help="maximum number of PDFs kept open")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), ParseHandler)
+    server.cache = DocumentCache(max_open=args.max_open)
+
+    print("=" * 70)
+    print("BP PARSE SERVER")
+    print("=" * 70)
+    print(f"Listening on http://{args.host}:{args.port} (max {args.max_open} open PDFs)")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down")
+    finally:
+        server.server_close()
+        server.cache.close()
+
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
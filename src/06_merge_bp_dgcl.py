@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Phase 5: Merge BP rows with DGCL data
+Vectorized hash join of every parsed BP CSV (all years, all collectivité types)
+with the DGCL tables on (year, kind, INSEE code, section, account code).
+Names on both sides are resolved through the collectivité registry, once per
+distinct name; the join itself is a single pandas merge.
+
+Inputs:
+    output/BP_<year>_<collectivite>.csv   (05_parse_bp_tables.py, ';'-delimited)
+        <collectivite> is a région folder name, or <type>-<name> for other
+        collectivités (BP_2024_dep-Guadeloupe.csv), type as in DGCL file names
+    output/DGCL_<year>_<type>.csv         (Phase 4, long format, ';'-delimited):
+        collectivite;section;account;<value columns...>
+        section uses the BP vocabulary (investment_expense, operating_revenue, ...),
+        account is the chapter code ("90", "922-1068", ...) or "total" for a section total
+
+Output: output/BP_DGCL_merged.csv and output/BP_DGCL_<year>_merged.csv (wide, one row per key)
+        output/BP_DGCL_unmatched.csv (keys present on one side only, unkeyed BP rows
+                                      and DGCL rows whose collectivité is unknown)
+"""
+
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from registry import KINDS, load_registry
+
+# Configuration
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+
+BP_PATTERN = re.compile(r'^BP_(\d{4})_(.+)\.csv$')
+DGCL_PATTERN = re.compile(r'^DGCL_(\d{4})_(.+)\.csv$')
+# BP_DGCL_*, synthetic ground-truth files and raw page tables from
+# 01_explore_bp_pdfs.py (BP_<year>_<region>_page<N>_table<M>.csv) are not parser outputs
+EXCLUDED_SUFFIXES = ('_merged', '_unmatched', '_truth')
+EXCLUDED_STEM = re.compile(r'_page\d+_table\d+$')
+# Columns a parsed BP CSV must have (05_parse_bp_tables.OUTPUT_COLUMNS)
+BP_REQUIRED_COLUMNS = ['region', 'section', 'row_type', 'level', 'description']
+# Optional "<type>-" prefix of a BP collectivité (types as in KIND_BY_FILE_TYPE)
+BP_TYPE_PREFIX = re.compile(r'^([A-Za-z]+)-(.+)$')
+
+KIND_BY_FILE_TYPE = {
+    'reg': 'region', 'regions': 'region',
+    'dep': 'departement', 'departements': 'departement',
+    'com': 'commune', 'communes': 'commune',
+}
+
+KEY_COLUMNS = ['year', 'kind', 'code_insee', 'section', 'account']
+BP_VALUE_COLUMNS = [
+    'budget_anterieur', 'restes_a_realiser_n1', 'propositions_nouvelles',
+    'vote_assemblee', 'total_budget',
+]
+
+# Leading chapter code of a BP description: "90 Opérations ventilées" -> "90",
+# "922-1068 Excédents ..." -> "922-1068", "001 Solde ..." -> "001"
+ACCOUNT_REGEX = r'^\s*(\d{2,4}(?:-\d+)?)\b'
+
+REGISTRY = load_registry()
+REGION_FOLDERS = set(REGISTRY.folder_names())
+
+
+def read_csv_files(pattern, directory=OUTPUT_DIR):
+    """Read every matching ';'-delimited CSV into one frame with a `year` column"""
+    frames = []
+    for path in sorted(directory.glob('*.csv')):
+        match = pattern.match(path.name)
+        if (not match or path.stem.endswith(EXCLUDED_SUFFIXES) or path.stem.startswith('BP_DGCL')
+                or EXCLUDED_STEM.search(path.stem)):
+            continue
+        df = pd.read_csv(path, sep=';', encoding='utf-8-sig', dtype=str, keep_default_na=False)
+        if pattern is BP_PATTERN:
+            missing = [c for c in BP_REQUIRED_COLUMNS if c not in df.columns]
+            if missing:
+                print(f"  WARNING: Skipping {path.name} - not a parsed BP file (missing {missing})")
+                continue
+        df['year'] = int(match.group(1))
+        df['source_file'] = path.name
+        if pattern is DGCL_PATTERN:
+            # DGCL files name the collectivité type (DGCL_2024_Reg.csv, ..._departements.csv)
+            df['kind_hint'] = KIND_BY_FILE_TYPE.get(match.group(2).casefold(), '')
+        else:
+            df['kind_hint'] = bp_kind(match.group(2))
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def bp_kind(collectivite):
+    """
+    Kind of the collectivité named in a BP file name: 'region' for a région
+    folder name, the kind of an explicit <type>- prefix, else '' (unknown)
+    """
+    if collectivite in REGION_FOLDERS:
+        return 'region'
+    prefix = BP_TYPE_PREFIX.match(collectivite)
+    if prefix:
+        return KIND_BY_FILE_TYPE.get(prefix.group(1).casefold(), '')
+    return ''
+
+
+def attach_codes(df, name_column):
+    """
+    Add `kind`, `code_insee` and `canonical_name` columns.
+    Each distinct (name, kind_hint) pair is resolved once and joined back.
+    Names keep their own code (current=False), so a pre-2016 région in an old
+    DGCL year joins with the BP of that same région, not its successor.
+    Without a kind hint, a name known under several kinds (Guadeloupe the
+    région and the département) is left unresolved rather than guessed.
+    Returns (df, unresolved names).
+    """
+    pairs = df[[name_column, 'kind_hint']].drop_duplicates().reset_index(drop=True)
+    entities = [
+        REGISTRY.resolve(name, kind=hint, current=False) if hint else _resolve_unique_kind(name)
+        for name, hint in pairs.itertuples(index=False)
+    ]
+    pairs['kind'] = [e['kind'] if e else None for e in entities]
+    pairs['code_insee'] = [e['code'] if e else None for e in entities]
+    pairs['canonical_name'] = [e['name'] if e else None for e in entities]
+    unresolved = sorted(pairs.loc[pairs['code_insee'].isna(), name_column])
+
+    df = df.merge(pairs, on=[name_column, 'kind_hint'], how='left')
+    return df, unresolved
+
+
+def _resolve_unique_kind(name):
+    """Entity for a name that resolves under exactly one kind, else None"""
+    entities = [e for e in (REGISTRY.resolve(name, kind=kind, current=False) for kind in KINDS) if e]
+    return entities[0] if len(entities) == 1 else None
+
+
+def prepare_bp(bp):
+    """
+    Keyed BP table: one row per key, values summed for duplicate keys.
+    Section headers are keyed as account 'total'; sub-lines (level 1) and
+    rows without a chapter code are returned separately as unkeyed.
+    """
+    bp, unresolved = attach_codes(bp, 'region')
+    bp['account'] = bp['description'].str.extract(ACCOUNT_REGEX, expand=False)
+    bp.loc[bp['row_type'] == 'section_header', 'account'] = 'total'
+
+    keyed_mask = (
+        (bp['level'] == '0') & bp['account'].notna()
+        & bp['code_insee'].notna() & (bp['section'] != 'unknown')
+    )
+    unkeyed = bp.loc[~keyed_mask, ['year', 'region', 'section', 'level', 'description', 'source_file']]
+
+    keyed = bp.loc[keyed_mask].copy()
+    for column in BP_VALUE_COLUMNS:
+        keyed[column] = pd.to_numeric(keyed[column], errors='coerce')
+    keyed = (keyed
+             .groupby(KEY_COLUMNS + ['canonical_name'], observed=True, sort=False)
+             .agg(**{f'bp_{c}': (c, 'sum') for c in BP_VALUE_COLUMNS},
+                  bp_description=('description', 'first'),
+                  bp_rows=('description', 'size'))
+             .reset_index())
+    return keyed, unkeyed, unresolved
+
+
+def prepare_dgcl(dgcl):
+    """
+    Keyed DGCL table: numeric value columns prefixed with dgcl_.
+    Returns (keyed, rows whose collectivité could not be resolved, unresolved names).
+    """
+    dgcl, unresolved = attach_codes(dgcl, 'collectivite')
+    unresolved_rows = dgcl.loc[dgcl['code_insee'].isna(),
+                               ['year', 'collectivite', 'section', 'account', 'source_file']]
+    value_columns = [c for c in dgcl.columns
+                     if c not in KEY_COLUMNS + ['collectivite', 'canonical_name', 'source_file', 'kind_hint']]
+    for column in value_columns:
+        dgcl[column] = pd.to_numeric(dgcl[column].str.replace(' ', '').str.replace(',', '.'),
+                                     errors='coerce')
+    dgcl = (dgcl[dgcl['code_insee'].notna()]
+            .groupby(KEY_COLUMNS + ['canonical_name'], observed=True, sort=False)[value_columns]
+            .sum()
+            .reset_index())
+    renamed = {c: c if c.startswith('dgcl_') else f'dgcl_{c}' for c in value_columns}
+    return dgcl.rename(columns=renamed), unresolved_rows, unresolved
+
+
+def join_bp_dgcl(bp_keyed, dgcl_keyed):
+    """
+    Full outer hash join on KEY_COLUMNS.
+    Returns (merged, unmatched) where unmatched lists keys found on one side only.
+    """
+    # Align key dtypes so both sides hash the same values
+    for column in KEY_COLUMNS:
+        bp_keyed[column] = bp_keyed[column].astype(str)
+        dgcl_keyed[column] = dgcl_keyed[column].astype(str)
+
+    merged = bp_keyed.merge(dgcl_keyed, on=KEY_COLUMNS, how='outer',
+                            validate='one_to_one', indicator='match')
+    merged['match'] = merged['match'].cat.rename_categories(
+        {'left_only': 'bp_only', 'right_only': 'dgcl_only', 'both': 'both'}
+    )
+    merged['year'] = merged['year'].astype(int)
+    merged['bp_rows'] = merged['bp_rows'].astype('Int64')
+    merged.insert(len(KEY_COLUMNS), 'canonical_name',
+                  merged.pop('canonical_name_x').fillna(merged.pop('canonical_name_y')))
+
+    unmatched = merged.loc[merged['match'] != 'both', KEY_COLUMNS + ['canonical_name', 'match']]
+    return merged.sort_values(KEY_COLUMNS, kind='stable').reset_index(drop=True), unmatched
+
+
+def write_outputs(merged, unmatched, unkeyed, dgcl_unresolved):
+    """Write merged (all years and per year) and unmatched reports"""
+    options = {'sep': ';', 'index': False, 'encoding': 'utf-8-sig'}
+
+    merged.to_csv(OUTPUT_DIR / "BP_DGCL_merged.csv", **options)
+    print("  ✓ Saved: BP_DGCL_merged.csv")
+    for year, part in merged.groupby('year'):
+        part.to_csv(OUTPUT_DIR / f"BP_DGCL_{year}_merged.csv", **options)
+        print(f"  ✓ Saved: BP_DGCL_{year}_merged.csv ({len(part)} rows)")
+
+    report = pd.concat([
+        unmatched.rename(columns={'match': 'reason'}),
+        unkeyed.assign(reason='bp_unkeyed'),
+        dgcl_unresolved.assign(reason='dgcl_unresolved'),
+    ], ignore_index=True)
+    report.to_csv(OUTPUT_DIR / "BP_DGCL_unmatched.csv", **options)
+    print(f"  ✓ Saved: BP_DGCL_unmatched.csv ({len(report)} rows)")
+
+
+def main():
+    """Join all BP outputs with all DGCL tables"""
+    print("=" * 70)
+    print("PHASE 5: BP <-> DGCL MERGE")
+    print("=" * 70)
+
+    bp = read_csv_files(BP_PATTERN)
+    dgcl = read_csv_files(DGCL_PATTERN)
+    if bp.empty:
+        print("ERROR: No BP CSV files found in output/")
+        return False
+    if dgcl.empty:
+        print("ERROR: No DGCL_<year>_<type>.csv files found in output/ (run Phase 4 first)")
+        return False
+
+    started = time.perf_counter()
+    bp_keyed, unkeyed, bp_unresolved = prepare_bp(bp)
+    dgcl_keyed, dgcl_unresolved_rows, dgcl_unresolved = prepare_dgcl(dgcl)
+    merged, unmatched = join_bp_dgcl(bp_keyed, dgcl_keyed)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    counts = merged['match'].value_counts()
+    print(f"\n  BP keys: {len(bp_keyed)}, DGCL keys: {len(dgcl_keyed)} "
+          f"(joined in {elapsed_ms:.0f} ms)")
+    print(f"  Matched: {counts.get('both', 0)}, BP only: {counts.get('bp_only', 0)}, "
+          f"DGCL only: {counts.get('dgcl_only', 0)}, unkeyed BP rows: {len(unkeyed)}")
+    if bp_unresolved or dgcl_unresolved:
+        print(f"  WARNING: names not in the registry: BP {bp_unresolved}, DGCL {dgcl_unresolved}")
+
+    write_outputs(merged, unmatched, unkeyed, dgcl_unresolved_rows)
+
+    print("\n" + "=" * 70)
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
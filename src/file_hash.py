@@ -0,0 +1,18 @@
+"""
+Content hashes used to key the caches in output/ (catalog, synthesis panel)
+
+Usage:
+    from file_hash import file_sha256
+    sha = file_sha256(pdf_path)
+"""
+
+import hashlib
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
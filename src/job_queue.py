@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Resumable job queue for running the pipeline over many years and collectivités
+Tasks are (stage, year, collectivité) rows in a local SQLite file. Workers lease
+one task at a time, renew the lease while it runs and record the outcome as soon
+as it finishes, so an interrupted run resumes with only the unfinished tasks.
+Expired leases (crashed workers) are picked up again, up to --max-attempts.
+
+Stages run in order; a task only starts once every earlier-stage task it
+depends on is done:
+    extract      03_extract_bp_pages.extract_pages      per (year, collectivité)
+    parse        05_parse_bp_tables.parse_pdf_to_rows   per (year, collectivité)
+    consolidate  04_merge_bp_pages.merge_extracted_pages per year       (collectivité '*')
+    join         06_merge_bp_dgcl.main                  all years (year 0, collectivité '*')
+
+join is not enqueued by default: it needs the DGCL_<year>_<type>.csv tables of
+Phase 4. Add it with --stages once they exist.
+
+Any number of worker processes can share the queue, on one machine or on several
+machines mounting the same directory. SQLite locking over network filesystems
+depends on the server's lock support (NFSv4 / SMB with byte-range locks).
+
+Usage:
+    python src/job_queue.py enqueue --years 2023 2024
+    python src/job_queue.py enqueue --years 2024 --stages join   # once DGCL tables exist
+    python src/job_queue.py work --workers 4
+    python src/job_queue.py status
+    python src/job_queue.py retry        # requeue failed tasks
+"""
+
+import argparse
+import importlib
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from registry import load_registry
+
+# Configuration
+OUTPUT_DIR = Path(__file__).parent.parent / "output"
+QUEUE_DB = OUTPUT_DIR / "job_queue.sqlite"
+
+STAGES = ["extract", "parse", "consolidate", "join"]
+# join needs DGCL inputs that nothing in the pipeline produces yet
+DEFAULT_STAGES = ["extract", "parse", "consolidate"]
+ALL = "*"
+
+LEASE_SECONDS = 300
+HEARTBEAT_SECONDS = 60
+POLL_SECONDS = 2.0
+MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    stage TEXT NOT NULL,
+    stage_rank INTEGER NOT NULL,
+    year INTEGER NOT NULL,
+    collectivite TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    last_error TEXT,
+    updated REAL,
+    UNIQUE (stage, year, collectivite)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, stage_rank);
+"""
+
+# A task is ready when no unfinished earlier-stage task it depends on remains:
+# same collectivité (or any, for '*' tasks), same year (or any, for year 0)
+CLAIM_SQL = """
+SELECT t.id, t.stage, t.year, t.collectivite FROM tasks t
+WHERE (t.status = 'pending' OR (t.status = 'running' AND t.lease_expires < :now))
+  AND t.attempts < t.max_attempts
+  AND NOT EXISTS (
+      SELECT 1 FROM tasks d
+      WHERE d.status != 'done' AND d.stage_rank < t.stage_rank
+        AND (t.year = 0 OR d.year = t.year)
+        AND (t.collectivite = '*' OR d.collectivite = t.collectivite)
+  )
+ORDER BY t.stage_rank, t.year, t.id
+LIMIT 1
+"""
+
+
+def connect(db_path=QUEUE_DB):
+    """Open the queue in autocommit mode; transactions are explicit"""
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    # Rollback journal rather than WAL: WAL needs shared memory, unavailable across machines
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.execute("PRAGMA busy_timeout=60000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def enqueue(conn, years, collectivites, stages=DEFAULT_STAGES, max_attempts=MAX_ATTEMPTS):
+    """Insert tasks (existing ones, done or not, are left untouched)"""
+    rows = []
+    for stage in stages:
+        rank = STAGES.index(stage)
+        if stage == "join":
+            rows.append((stage, rank, 0, ALL))
+            continue
+        for year in years:
+            if stage == "consolidate":
+                rows.append((stage, rank, year, ALL))
+            else:
+                rows.extend((stage, rank, year, c) for c in collectivites)
+
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    before = conn.total_changes
+    conn.executemany(
+        "INSERT OR IGNORE INTO tasks (stage, stage_rank, year, collectivite, max_attempts, updated) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [row + (max_attempts, now) for row in rows],
+    )
+    conn.execute("COMMIT")
+    return conn.total_changes - before
+
+
+def claim(conn, owner):
+    """Lease the next ready task, or return None"""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Tasks whose worker died on their last attempt
+        conn.execute(
+            "UPDATE tasks SET status = 'failed', last_error = COALESCE(last_error, 'lease expired'), "
+            "lease_owner = NULL, lease_expires = NULL, updated = :now "
+            "WHERE status = 'running' AND lease_expires < :now AND attempts >= max_attempts",
+            {'now': now},
+        )
+        row = conn.execute(CLAIM_SQL, {'now': now}).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE tasks SET status = 'running', attempts = attempts + 1, lease_owner = ?, "
+            "lease_expires = ?, updated = ? WHERE id = ?",
+            (owner, now + LEASE_SECONDS, now, row[0]),
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return {'id': row[0], 'stage': row[1], 'year': row[2], 'collectivite': row[3]}
+
+
+def renew(conn, task_id, owner):
+    """Extend the lease of a running task held by owner"""
+    conn.execute(
+        "UPDATE tasks SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+        (time.time() + LEASE_SECONDS, task_id, owner),
+    )
+
+
+def finish(conn, task_id, owner, error=None):
+    """Checkpoint a task outcome; failed tasks go back to pending until max_attempts"""
+    now = time.time()
+    if error is None:
+        conn.execute(
+            "UPDATE tasks SET status = 'done', lease_owner = NULL, lease_expires = NULL, "
+            "last_error = NULL, updated = ? WHERE id = ? AND lease_owner = ?",
+            (now, task_id, owner),
+        )
+    else:
+        conn.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'pending' END, "
+            "lease_owner = NULL, lease_expires = NULL, last_error = ?, updated = ? "
+            "WHERE id = ? AND lease_owner = ?",
+            (error, now, task_id, owner),
+        )
+
+
+def release(conn, task_id, owner):
+    """Hand an interrupted task back untouched: pending again, attempt refunded"""
+    conn.execute(
+        "UPDATE tasks SET status = 'pending', attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+        "lease_expires = NULL, updated = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+        (time.time(), task_id, owner),
+    )
+
+
+def counts(conn):
+    """{status: n} over all tasks"""
+    return dict(conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall())
+
+
+def run_task(task):
+    """Run one task in this process; raises on failure"""
+    stage, year, collectivite = task['stage'], task['year'], task['collectivite']
+
+    if stage == "extract":
+        extract_bp = importlib.import_module("03_extract_bp_pages")
+        configs = {c['folder_name']: (key, c) for key, c in extract_bp.load_regions_config().items()}
+        if collectivite not in configs:
+            raise RuntimeError(f"{collectivite} has no page range in regions_config.yaml")
+        region_key, region_config = configs[collectivite]
+        if extract_bp.page_range(region_config, year) is None:
+            # Page numbers differ between years: never reuse another year's range
+            raise RuntimeError(f"{collectivite} has no {year} page range in regions_config.yaml")
+        if not extract_bp.extract_pages(region_key, region_config, year=str(year)):
+            raise RuntimeError(f"extraction failed for {collectivite} {year}")
+
+    elif stage == "parse":
+        parse_bp = importlib.import_module("05_parse_bp_tables")
+        pdf_path = OUTPUT_DIR / f"BP_{year}_{collectivite}_extracted.pdf"
+        if not pdf_path.exists():
+            raise RuntimeError(f"PDF not found: {pdf_path.name}")
+        rows = parse_bp.parse_pdf_to_rows(pdf_path, collectivite, as_frame=True)
+        if rows is None or rows.empty:
+            raise RuntimeError(f"parsing failed for {collectivite} {year}")
+        parse_bp.write_csv(rows, OUTPUT_DIR / f"BP_{year}_{collectivite}.csv")
+
+    elif stage == "consolidate":
+        merge_bp = importlib.import_module("04_merge_bp_pages")
+        if not merge_bp.merge_extracted_pages(str(year)):
+            raise RuntimeError(f"consolidation failed for {year}")
+
+    elif stage == "join":
+        join_bp = importlib.import_module("06_merge_bp_dgcl")
+        if not join_bp.main():
+            raise RuntimeError("BP/DGCL join failed")
+
+    else:
+        raise ValueError(f"unknown stage {stage!r}")
+
+
+def worker(db_path=QUEUE_DB, wait=True):
+    """
+    Claim and run tasks until none are left.
+    With wait=True, keep polling while other workers still hold tasks that
+    could unblock later stages.
+    """
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    conn = connect(db_path)
+    done = failed = 0
+
+    while True:
+        task = claim(conn, owner)
+        if task is None:
+            status = counts(conn)
+            if wait and status.get('running', 0):
+                time.sleep(POLL_SECONDS)
+                continue
+            break
+
+        # Heartbeat keeps the lease alive on long tasks (one connection per thread)
+        stop = threading.Event()
+
+        def heartbeat():
+            hb_conn = connect(db_path)
+            while not stop.wait(HEARTBEAT_SECONDS):
+                renew(hb_conn, task['id'], owner)
+            hb_conn.close()
+
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+        try:
+            run_task(task)
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=5)}"
+        except BaseException:
+            # Ctrl-C / SystemExit: not the task's fault, so a resumed run picks
+            # it up at once instead of waiting for the lease to expire
+            release(conn, task['id'], owner)
+            raise
+        finally:
+            stop.set()
+            beat.join()
+
+        finish(conn, task['id'], owner, error)
+        label = f"{task['stage']} {task['year']} {task['collectivite']}"
+        if error is None:
+            done += 1
+            print(f"  ✓ [{owner}] {label}")
+        else:
+            failed += 1
+            print(f"  ERROR [{owner}] {label}: {error.splitlines()[0]}")
+
+    conn.close()
+    return done, failed
+
+
+def _worker_process(db_path):
+    return worker(db_path)
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Resumable pipeline job queue")
+    parser.add_argument('--db', type=Path, default=QUEUE_DB, help="queue SQLite file")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_enqueue = sub.add_parser('enqueue', help="add tasks")
+    p_enqueue.add_argument('--years', type=int, nargs='+', required=True)
+    p_enqueue.add_argument('--collectivites', nargs='+', default=None,
+                           help="folder names (default: all régions in the registry)")
+    p_enqueue.add_argument('--stages', nargs='+', choices=STAGES, default=DEFAULT_STAGES,
+                           help=f"default: {' '.join(DEFAULT_STAGES)} (join needs DGCL tables)")
+    p_enqueue.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+
+    p_work = sub.add_parser('work', help="run worker processes until the queue is drained")
+    p_work.add_argument('--workers', type=int, default=1)
+
+    sub.add_parser('status', help="show task counts")
+    sub.add_parser('retry', help="requeue failed tasks with a fresh attempt budget")
+
+    args = parser.parse_args()
+    conn = connect(args.db)
+
+    if args.command == 'enqueue':
+        collectivites = args.collectivites or load_registry().folder_names()
+        added = enqueue(conn, args.years, collectivites, args.stages, args.max_attempts)
+        print(f"  ✓ Enqueued {added} new task(s)")
+
+    elif args.command == 'work':
+        print("=" * 70)
+        print(f"JOB QUEUE: {args.workers} worker(s) on {args.db}")
+        print("=" * 70)
+        if args.workers == 1:
+            results = [worker(args.db)]
+        else:
+            with multiprocessing.Pool(args.workers) as pool:
+                results = pool.map(_worker_process, [args.db] * args.workers)
+        done = sum(r[0] for r in results)
+        failed = sum(r[1] for r in results)
+        print(f"\nThis run: {done} done, {failed} failed attempt(s)")
+
+    elif args.command == 'retry':
+        conn.execute("UPDATE tasks SET status = 'pending', attempts = 0 WHERE status = 'failed'")
+        print("  ✓ Failed tasks requeued")
+
+    status = counts(conn)
+    print(f"Queue: {', '.join(f'{k}={v}' for k, v in sorted(status.items())) or 'empty'}")
+    for stage, year, collectivite, error in conn.execute(
+            "SELECT stage, year, collectivite, last_error FROM tasks WHERE status = 'failed'"):
+        print(f"  FAILED {stage} {year} {collectivite}: {error.splitlines()[0] if error else ''}")
+
+    conn.close()
+    return not status.get('failed', 0)
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
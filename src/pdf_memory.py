@@ -0,0 +1,111 @@
+"""
+Bounded-memory page iteration for large BP PDFs
+pdfplumber caches parsed layout objects on each page and the document keeps
+pages alive while it is open, so RSS grows with the number of pages walked.
+iter_pages_bounded() releases each page right after use, reopens the document
+every `window` pages, and applies backpressure when RSS crosses a ceiling:
+the window is halved (down to one page) after freeing memory, and a
+MemoryError is raised only if RSS stays above the ceiling with a one-page
+window. The ceiling is checked before each page is opened, never after the
+last one. A ceiling the process already exceeds before reading any page is
+rejected up front with a MemoryError, since that memory cannot be released here.
+
+Usage:
+    from pdf_memory import iter_pages_bounded
+    for page_idx, page in iter_pages_bounded(pdf_path, range(n), window=20, max_rss_mb=800):
+        tables = page.extract_tables()
+"""
+
+import ctypes
+import gc
+import resource
+import sys
+
+import pdfplumber
+
+# Defaults used by the --low-memory flags of the numbered scripts
+PAGE_WINDOW = 20
+MAX_RSS_MB = None
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, KB on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def release_memory():
+    """Collect garbage and hand freed heap back to the OS where glibc allows it"""
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def page_count(pdf_path):
+    """Number of pages, without keeping the document open"""
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_pages_bounded(pdf_path, page_indices, window=PAGE_WINDOW, max_rss_mb=MAX_RSS_MB):
+    """
+    Yield (page_idx, page) for the given 0-based page indices.
+    Each page is closed once the caller moves on; the document is reopened
+    every `window` pages. Pages must not be used after the next iteration.
+    """
+    pending = list(page_indices)
+    window = max(1, window)
+    baseline = current_rss_mb()
+    ceiling = max_rss_mb
+    if ceiling and baseline > ceiling:
+        # Memory held by the caller cannot be released here
+        raise MemoryError(
+            f"RSS {baseline:.0f} MB already above ceiling {ceiling} MB before reading "
+            f"{pdf_path}; the ceiling must leave room above the process's own footprint"
+        )
+
+    while pending:
+        batch, pending = pending[:window], pending[window:]
+        # Only the batch's pages: opening the whole document builds a Page per
+        # page on every reopen, quadratic in the page count for small windows
+        with pdfplumber.open(pdf_path, pages=[i + 1 for i in batch]) as pdf:
+            # pdf.pages follows document order, not batch order
+            by_number = {page.page_number: page for page in pdf.pages}
+            for position, page_idx in enumerate(batch):
+                if position and ceiling and current_rss_mb() > ceiling:
+                    # Backpressure: finish this document handle early and retry
+                    # the rest of the batch with a smaller window
+                    pending = batch[position:] + pending
+                    break
+
+                page = by_number[page_idx + 1]
+                try:
+                    yield page_idx, page
+                finally:
+                    page.close()
+        release_memory()
+
+        if not (pending and ceiling):
+            continue
+        rss = current_rss_mb()
+        if rss > ceiling:
+            if window == 1:
+                raise MemoryError(
+                    f"RSS {rss:.0f} MB still above ceiling {ceiling} MB after releasing pages "
+                    f"with a single page window (entry RSS {baseline:.0f} MB, {pdf_path})"
+                )
+            window = max(1, window // 2)
+            print(f"  Memory ceiling reached, page window reduced to {window}")
@@ -0,0 +1,251 @@
+"""
+Canonical collectivité registry (régions, départements, communes)
+Loads config/collectivites.yaml (plus the INSEE COG commune file when present)
+and compiles it into dict lookups, so every stage resolves any known spelling
+of a name in constant time:
+
+    from registry import load_registry
+    reg = load_registry()
+    reg.resolve("Provence Alpes Cote d'Azur")      # -> région 93 entry
+    reg.resolve("Limousin")                         # -> Nouvelle-Aquitaine (successor)
+    reg.resolve("Limousin", current=False)          # -> former région 74
+    reg.resolve("Gironde", kind="departement")
+    reg.group_members("bp_group", 1)
+
+The compiled index is cached in output/cache/ keyed by the source files' hash.
+
+Usage:
+    python src/registry.py --export   # writes output/collectivites_aliases.csv for R
+"""
+
+import argparse
+import contextlib
+import csv
+import hashlib
+import os
+import pickle
+import re
+import sys
+import unicodedata
+from pathlib import Path
+
+import yaml
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+CONFIG_DIR = ROOT_DIR / "config"
+DATA_DIR = ROOT_DIR / "data"
+OUTPUT_DIR = ROOT_DIR / "output"
+CACHE_DIR = OUTPUT_DIR / "cache"
+
+REGISTRY_FILE = CONFIG_DIR / "collectivites.yaml"
+COMMUNES_GLOB = "INSEE/v_commune_*.csv"
+ALIASES_CSV = OUTPUT_DIR / "collectivites_aliases.csv"
+
+KINDS = ("region", "departement", "commune")
+CACHE_VERSION = 2
+
+
+def fold_name(name):
+    """
+    Normalise a name for matching: strip accents, casefold and treat
+    hyphens, apostrophes, underscores and repeated spaces as one space.
+    "Provence-Alpes-Côte d’Azur" and "provence alpes cote d'azur" fold alike.
+    """
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[-_'’`.,/]+", ' ', text.casefold())
+    return ' '.join(text.split())
+
+
+class Registry:
+    """
+    Compiled registry.
+    entities: id -> entity dict, ids are '<kind>:<code>' (e.g. 'region:84')
+    aliases: (kind, folded name) -> tuple of ids (several for homonym communes)
+    """
+
+    def __init__(self, entities, aliases):
+        self.entities = entities
+        self.aliases = aliases
+
+    def get(self, kind, code):
+        """Entity for an INSEE code, or None"""
+        return self.entities.get(f"{kind}:{code}")
+
+    def candidates(self, name, kind="region"):
+        """All entities whose name or alias folds to `name`"""
+        return [self.entities[i] for i in self.aliases.get((kind, fold_name(name)), ())]
+
+    def resolve(self, name, kind="region", current=True):
+        """
+        Resolve a name to a single entity, or None if unknown or ambiguous.
+        current=True follows merged_into, so former régions resolve to the
+        région that absorbed them.
+        """
+        ids = self.aliases.get((kind, fold_name(name)), ())
+        if len(ids) != 1:
+            return None
+        entity = self.entities[ids[0]]
+        if current:
+            while entity.get('merged_into'):
+                entity = self.entities[f"{kind}:{entity['merged_into']}"]
+        return entity
+
+    def resolve_any(self, name, kinds=KINDS, current=True):
+        """Resolve a name trying each kind in turn (régions first), or None"""
+        for kind in kinds:
+            entity = self.resolve(name, kind=kind, current=current)
+            if entity is not None:
+                return entity
+        return None
+
+    def successor_map(self, names, kind="region", field="name"):
+        """
+        {name: current entity's `field`} for the resolvable names, for vectorised
+        remaps (field="synthese_name" gives the labels of the synthesis file)
+        """
+        mapping = {}
+        for name in names:
+            entity = self.resolve(name, kind=kind)
+            if entity is not None:
+                mapping[name] = entity[field]
+        return mapping
+
+    def group_members(self, group, value):
+        """Entities whose `group` field equals value, in registry order"""
+        return [e for e in self.entities.values() if e.get(group) == value]
+
+    def folder_names(self):
+        """folder_name of every région processed by the BP pipeline, in registry order"""
+        return [e['folder_name'] for e in self.entities.values()
+                if e['kind'] == 'region' and e.get('folder_name')]
+
+
+def _source_files():
+    return [REGISTRY_FILE] + sorted(DATA_DIR.glob(COMMUNES_GLOB))
+
+
+def _sources_hash(paths):
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    for path in paths:
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def _read_communes(paths):
+    """Yield (code, name, dep) for current communes in INSEE COG files"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                # TYPECOM: COM (commune), ARM (arrondissement), COMA/COMD (associated/delegated)
+                if row.get('TYPECOM', 'COM') == 'COM':
+                    yield row['COM'], row['LIBELLE'], row.get('DEP', '')
+
+
+def compile_registry(config, commune_files=()):
+    """Build a Registry from the parsed YAML and optional COG commune files"""
+    entities = {}
+    aliases = {}
+
+    def add(kind, code, name, extra_aliases=(), **fields):
+        entity_id = f"{kind}:{code}"
+        entities[entity_id] = {'id': entity_id, 'kind': kind, 'code': code, 'name': name, **fields}
+        names = [name, code, *extra_aliases]
+        if fields.get('folder_name'):
+            names.append(fields['folder_name'])
+        for alias in names:
+            key = (kind, fold_name(alias))
+            ids = aliases.get(key, ())
+            if entity_id not in ids:
+                aliases[key] = ids + (entity_id,)
+
+    for region in config['regions']:
+        add('region', region['code'], region['name'], region.get('aliases', ()),
+            folder_name=region.get('folder_name'), bp_group=region.get('bp_group'),
+            synthese_name=region.get('synthese_name', region['name']))
+    for region in config.get('former_regions', []):
+        add('region', region['code'], region['name'], region.get('aliases', ()),
+            merged_into=region['merged_into'], synthese_name=region['name'])
+
+    dep_aliases = config.get('departement_aliases', {})
+    for code, name, region_code in config['departements']:
+        add('departement', code, name, dep_aliases.get(code, ()), region=region_code)
+
+    communes = list(config.get('communes') or [])
+    communes.extend(_read_communes(commune_files))
+    for code, name, dep in communes:
+        add('commune', code, name, departement=dep)
+
+    return Registry(entities, aliases)
+
+
+def load_registry(rebuild=False):
+    """Load the compiled registry from cache, recompiling when sources change"""
+    paths = _source_files()
+    cache_path = CACHE_DIR / f"registry_{_sources_hash(paths)}.pickle"
+
+    if not rebuild and cache_path.exists():
+        with open(cache_path, 'rb') as f:
+            return Registry(*pickle.load(f))
+
+    with open(REGISTRY_FILE, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    registry = compile_registry(config, paths[1:])
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Written aside and renamed, so concurrent loaders never read a partial pickle
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        # Plain dicts only, so the cache does not depend on the importing module
+        pickle.dump((registry.entities, registry.aliases), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, cache_path)
+    for old in CACHE_DIR.glob("registry_*.pickle"):
+        if old != cache_path:
+            # Another process may be cleaning up at the same time
+            with contextlib.suppress(FileNotFoundError):
+                old.unlink()
+    return registry
+
+
+def export_aliases(registry, output_path=ALIASES_CSV):
+    """Write folded alias -> entity table (read by R/laurent_data.R in place of reg_dict)"""
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['kind', 'alias_folded', 'code', 'name', 'current_code', 'current_name',
+                         'current_synthese_name'])
+        for (kind, alias), ids in sorted(registry.aliases.items()):
+            for entity_id in ids:
+                entity = registry.entities[entity_id]
+                current = registry.resolve(entity['code'], kind=kind) or entity
+                writer.writerow([kind, alias, entity['code'], entity['name'],
+                                 current['code'], current['name'], current.get('synthese_name', '')])
+    print(f"  ✓ Saved: {output_path.name}")
+
+
+def main():
+    """Compile the registry and print a summary"""
+    parser = argparse.ArgumentParser(description="Compile the collectivité registry")
+    parser.add_argument('--rebuild', action='store_true', help="ignore the compiled cache")
+    parser.add_argument('--export', action='store_true', help=f"write {ALIASES_CSV.name}")
+    args = parser.parse_args()
+
+    registry = load_registry(rebuild=args.rebuild)
+    for kind in KINDS:
+        n = sum(1 for e in registry.entities.values() if e['kind'] == kind)
+        print(f"  {kind}: {n} entities")
+    print(f"  aliases: {len(registry.aliases)}")
+
+    ambiguous = sum(1 for ids in registry.aliases.values() if len(ids) > 1)
+    if ambiguous:
+        print(f"  ambiguous aliases (homonyms): {ambiguous}")
+
+    if args.export:
+        export_aliases(registry)
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Watch mode: incrementally rebuild outputs when source documents change
+Polls the BP source tree and the config files, debounces bursts of events,
+maps each change to the affected (year, région) outputs and re-runs only those:
+extract (03) -> parse (05) -> consolidate (04) for the affected years,
+optionally followed by the BP/DGCL join (06).
+
+    data/Documents BP Collectivités/<Folder>/BP/BP<year>.pdf   -> (year, Folder)
+                                      (deleted: its extracted PDF and CSV are removed)
+    config/regions_config.yaml                                 -> (year, région) whose page range changed
+    config/collectivites.yaml                                  -> re-consolidate every known year
+
+Polling (stat of a few hundred files) is used rather than inotify so the
+same code works on network mounts and on macOS.
+
+Usage:
+    python src/watch_bp.py [--interval 1] [--debounce 2] [--join]
+"""
+
+import argparse
+import importlib
+import re
+import sys
+import time
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import job_queue
+
+extract_bp = importlib.import_module("03_extract_bp_pages")
+
+# Configuration
+ROOT_DIR = Path(__file__).parent.parent
+DATA_DIR = ROOT_DIR / "data"
+BP_DIR = DATA_DIR / "Documents BP Collectivités"
+CONFIG_DIR = ROOT_DIR / "config"
+OUTPUT_DIR = ROOT_DIR / "output"
+REGIONS_CONFIG = CONFIG_DIR / "regions_config.yaml"
+REGISTRY_FILE = CONFIG_DIR / "collectivites.yaml"
+
+# Only the file 03_extract_bp_pages.py reads (BP<year>.pdf)
+BP_FILE_PATTERN = re.compile(r'^BP(\d{4})\.pdf$')
+
+# Modules holding a registry loaded at import time
+REGISTRY_MODULES = ["registry", "03_extract_bp_pages", "04_merge_bp_pages", "05_parse_bp_tables",
+                    "06_merge_bp_dgcl"]
+
+
+def snapshot():
+    """{path: (mtime_ns, size)} for every watched file"""
+    paths = list(BP_DIR.glob("*/BP/*.pdf")) if BP_DIR.exists() else []
+    paths += [p for p in (REGIONS_CONFIG, REGISTRY_FILE) if p.exists()]
+    state = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def changed_paths(before, after):
+    """Paths added, removed or modified between two snapshots"""
+    return {p for p in before.keys() | after.keys() if before.get(p) != after.get(p)}
+
+
+def load_regions_config():
+    """regions_config.yaml entries keyed by folder name (None if unreadable)"""
+    try:
+        regions = extract_bp.load_regions_config()
+    except (OSError, yaml.YAMLError, KeyError, TypeError, AttributeError, ValueError) as e:
+        print(f"  WARNING: could not read {REGIONS_CONFIG.name}: {e}")
+        return None
+    return {c['folder_name']: c for c in regions.values()}
+
+
+def source_years(folder):
+    """Years with a BP PDF for a région folder"""
+    years = set()
+    for path in (BP_DIR / folder / "BP").glob("*.pdf"):
+        match = BP_FILE_PATTERN.match(path.name)
+        if match:
+            years.add(int(match.group(1)))
+    return years
+
+
+def with_page_range(targets, config):
+    """Targets whose year has a page range, warning about the others"""
+    kept = set()
+    for year, folder in targets:
+        if extract_bp.page_range(config[folder], year) is None:
+            print(f"  WARNING: {folder} has no {year} page range in {REGIONS_CONFIG.name}, skipped")
+        else:
+            kept.add((year, folder))
+    return kept
+
+
+def affected_outputs(paths, old_config, new_config):
+    """
+    Map changed files to (set of (year, folder) to re-extract, set of (year, folder)
+    whose source PDF was deleted, set of years to re-consolidate)
+    """
+    targets = set()
+    removed = set()
+    consolidate_years = set()
+
+    for path in paths:
+        if path == REGIONS_CONFIG:
+            for folder in old_config.keys() | new_config.keys():
+                if folder not in new_config:
+                    continue
+                for year in source_years(folder):
+                    if (extract_bp.page_range(old_config.get(folder, {}), year)
+                            != extract_bp.page_range(new_config[folder], year)):
+                        targets.add((year, folder))
+        elif path == REGISTRY_FILE:
+            consolidate_years.update(year for folder in new_config for year in source_years(folder))
+        else:
+            match = BP_FILE_PATTERN.match(path.name)
+            folder = path.parent.parent.name
+            if match and not path.exists():
+                removed.add((int(match.group(1)), folder))
+            elif match and folder in new_config:
+                targets.add((int(match.group(1)), folder))
+            elif match:
+                print(f"  WARNING: {folder} has no entry in {REGIONS_CONFIG.name}, skipped")
+
+    targets = with_page_range(targets, new_config)
+    consolidate_years.update(year for year, _ in targets | removed)
+    return targets, removed, consolidate_years
+
+
+def remove_outputs(removed):
+    """Delete the extracted PDF and parsed CSV of documents whose source is gone"""
+    for year, folder in sorted(removed):
+        for path in (OUTPUT_DIR / f"BP_{year}_{folder}_extracted.pdf", OUTPUT_DIR / f"BP_{year}_{folder}.csv"):
+            if path.exists():
+                path.unlink()
+                print(f"  ✓ Removed: {path.name} (source PDF deleted)")
+
+
+def rebuild(targets, consolidate_years, join=False, removed=()):
+    """
+    Remove outputs of deleted sources, re-run extract/parse per target, then
+    consolidate (and join) per affected year
+    """
+    remove_outputs(removed)
+    tasks = []
+    for year, folder in sorted(targets):
+        tasks.append({'stage': 'extract', 'year': year, 'collectivite': folder})
+        tasks.append({'stage': 'parse', 'year': year, 'collectivite': folder})
+    for year in sorted(consolidate_years):
+        tasks.append({'stage': 'consolidate', 'year': year, 'collectivite': job_queue.ALL})
+    if join and tasks:
+        tasks.append({'stage': 'join', 'year': 0, 'collectivite': job_queue.ALL})
+
+    failed = set()
+    for task in tasks:
+        # Skip parse when its extract failed
+        if (task['year'], task['collectivite']) in failed:
+            continue
+        try:
+            job_queue.run_task(task)
+        except Exception as e:
+            print(f"  ERROR {task['stage']} {task['year']} {task['collectivite']}: {e}")
+            failed.add((task['year'], task['collectivite']))
+    return not failed
+
+
+def reload_registry_modules():
+    """Reload modules that captured the registry at import time"""
+    for name in REGISTRY_MODULES:
+        if name in sys.modules:
+            importlib.reload(sys.modules[name])
+
+
+def watch(interval, debounce, join=False):
+    """Poll forever, rebuilding affected outputs after each debounced burst"""
+    state = snapshot()
+    config = load_regions_config() or {}
+    print(f"Watching {len(state)} file(s) every {interval}s (debounce {debounce}s). Ctrl-C to stop.")
+
+    while True:
+        time.sleep(interval)
+        current = snapshot()
+        pending = changed_paths(state, current)
+        if not pending:
+            continue
+
+        # Debounce: wait until the tree has been quiet for `debounce` seconds
+        quiet_since = time.monotonic()
+        while time.monotonic() - quiet_since < debounce:
+            time.sleep(min(interval, debounce))
+            latest = snapshot()
+            more = changed_paths(current, latest)
+            if more:
+                pending |= more
+                current = latest
+                quiet_since = time.monotonic()
+
+        new_config = config
+        if REGISTRY_FILE in pending:
+            reload_registry_modules()
+        if REGIONS_CONFIG in pending or REGISTRY_FILE in pending:
+            # Folder names come from the registry; a half-written or invalid
+            # file keeps the last good config
+            new_config = load_regions_config()
+            if new_config is None:
+                print(f"  Keeping the previous {REGIONS_CONFIG.name}")
+                new_config = config
+        targets, removed, years = affected_outputs(pending, config, new_config)
+
+        print("\n" + "=" * 70)
+        print(f"{len(pending)} change(s): rebuilding {len(targets)} document(s), "
+              f"removing {len(removed)}, consolidating {sorted(years)}")
+        print("=" * 70)
+        started = time.perf_counter()
+        ok = rebuild(targets, years, join=join, removed=removed)
+        print(f"\n{'✓ Up to date' if ok else 'Rebuilt with errors'} in {time.perf_counter() - started:.1f}s")
+
+        state, config = current, new_config
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Rebuild outputs when BP sources change")
+    parser.add_argument('--interval', type=float, default=1.0, help="poll interval in seconds")
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help="quiet period before rebuilding, in seconds")
+    parser.add_argument('--join', action='store_true', help="also re-run the BP/DGCL join")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("BP WATCH MODE")
+    print("=" * 70)
+
+    try:
+        watch(args.interval, args.debounce, join=args.join)
+    except KeyboardInterrupt:
+        print("\nStopped")
+    return True
+
+
+if __name__ == "__main__":
+    success = main()
+    sys.exit(0 if success else 1)